@@ -0,0 +1,107 @@
+import argparse
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+import time
+from overlaycodecs import OVERLAY_CODECS
+
+# Compares the chat overlay codecs on this machine: how long the intermediate
+# takes to encode, how long the combine step takes to decode it and how big
+# it is on disk.
+#
+#   python bench_overlay_codecs.py                      synthetic overlay
+#   python bench_overlay_codecs.py --chat chat.json     real chat render
+#
+# With --chat every codec is rendered by TwitchDownloaderCLI chatrender, so
+# its encode time includes drawing the chat, as it does in a real job. The
+# synthetic source is a busy test pattern and so a worst case for the
+# lossless codecs; real chat is mostly static and compresses far better.
+
+
+def run_timed(command):
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit code {result.returncode}")
+    return elapsed
+
+
+def encode_synthetic(args, codec, output):
+    command = [
+        args.ffmpeg, "-y", "-f", "lavfi",
+        "-i", f"testsrc2=s={args.width}x{args.height}:r={args.framerate}:d={args.duration},format=rgba",
+        *shlex.split(codec["output_args"]), output
+    ]
+    return run_timed(command)
+
+
+def encode_chat(args, codec, output):
+    command = [
+        args.renderer, "chatrender",
+        "-i", args.chat,
+        "-o", output,
+        "--font-size", str(args.font_size),
+        "--chat-width", str(args.width),
+        "--chat-height", str(args.height),
+        "--framerate", str(args.framerate),
+        "--background-color", "#40808080",
+        f"--output-args={codec['output_args']} \"{{save_path}}\""
+    ]
+    return run_timed(command)
+
+
+def decode(args, codec, path):
+    # Decodes the way the combine step reads it, alpha included
+    command = [args.ffmpeg, *codec["input_args"], "-i", path, "-vf", "format=rgba", "-f", "null", "-"]
+    return run_timed(command)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark intermediate codecs for the rendered chat overlay")
+    parser.add_argument("--chat", help="chat JSON to render with TwitchDownloaderCLI instead of a synthetic overlay")
+    parser.add_argument("--codecs", nargs="+", choices=list(OVERLAY_CODECS), default=list(OVERLAY_CODECS))
+    parser.add_argument("--width", type=int, default=458)
+    parser.add_argument("--height", type=int, default=661)
+    parser.add_argument("--framerate", type=int, default=12)
+    parser.add_argument("--font-size", type=int, default=24)
+    parser.add_argument("--duration", type=float, default=60, help="seconds of synthetic overlay")
+    parser.add_argument("--runs", type=int, default=1, help="runs per codec; the fastest is reported")
+    parser.add_argument("--ffmpeg", default="ffmpeg")
+    parser.add_argument("--renderer", default="TwitchDownloaderCLI")
+    parser.add_argument("--keep", help="directory to keep the rendered files in")
+    args = parser.parse_args()
+
+    work_dir = args.keep or tempfile.mkdtemp(prefix="overlay_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    source = args.chat or f"synthetic {args.width}x{args.height} @ {args.framerate} fps, {args.duration:g}s"
+    print(f"Overlay codec benchmark ({source})\n")
+    print(f"{'codec':<10}{'encode s':>10}{'decode s':>10}{'size MB':>10}{'decode fps':>12}")
+
+    try:
+        for name in args.codecs:
+            codec = OVERLAY_CODECS[name]
+            output = os.path.join(work_dir, f"chat_{name}{codec['extension']}")
+            try:
+                if args.chat:
+                    encode_time = min(encode_chat(args, codec, output) for _ in range(args.runs))
+                else:
+                    encode_time = min(encode_synthetic(args, codec, output) for _ in range(args.runs))
+                decode_time = min(decode(args, codec, output) for _ in range(args.runs))
+            except (OSError, RuntimeError) as e:
+                print(f"{name:<10}failed: {e}")
+                continue
+
+            size_mb = os.path.getsize(output) / (1024 * 1024)
+            frames = args.duration * args.framerate if not args.chat else None
+            fps = f"{frames / decode_time:.0f}" if frames else "-"
+            print(f"{name:<10}{encode_time:>10.2f}{decode_time:>10.2f}{size_mb:>10.1f}{fps:>12}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
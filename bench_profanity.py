@@ -0,0 +1,108 @@
+import argparse
+import random
+import re
+import time
+from collections import namedtuple
+from profanity import DEFAULT_LANGUAGE, ProfanityMatcher, get_matcher
+
+# Times swear word detection over a synthetic multi-hour transcript, comparing
+# the compiled lexicon matcher with the regex list transcribe_audio used to
+# compile and run word by word.
+#
+#   python bench_profanity.py --hours 3
+
+Word = namedtuple("Word", "text start end")
+
+WORDS_PER_SECOND = 2.5
+VOCABULARY = (
+    "the a and to of I you it is that in this was for on with he she they we "
+    "what just like so but not do go no yeah okay right get got chat guys "
+    "stream game play round kill shot team push rotate heal reload nice "
+    "assume assist last class pass grass ask asked assets basically "
+    "shit fuck fucking damn ass bitch dick shitty fuuuck f**k sh*t asshole"
+).split()
+# Chance that a word is picked from the tail of the vocabulary (swearing)
+SWEAR_SHARE = 0.02
+
+OLD_SWEAR_PATTERNS = [
+    r'\bf[u\*]+ck',
+    r'\bsh[i\*]+t',
+    r'\bd[a\*]+mn',
+    r'\bb[i\*]+tch',
+    r'\ba[s\*]+',
+    r'\bmotherfuck',
+    r'\bretard(?:s|ed)?',
+    r'\bcunts?',
+    r'\bd[i\*]+ck',
+    r'\bp[e\*]+nis',
+]
+
+
+def make_transcript(hours, seed=0):
+    rng = random.Random(seed)
+    clean = VOCABULARY[:-11]
+    swears = VOCABULARY[-11:]
+    words = []
+    t = 0
+    for _ in range(int(hours * 3600 * WORDS_PER_SECOND)):
+        text = rng.choice(swears) if rng.random() < SWEAR_SHARE else rng.choice(clean)
+        if rng.random() < 0.1:
+            text = text.capitalize() + rng.choice(",.!?")
+        duration = rng.randint(150, 500)
+        words.append(Word(text, t, t + duration))
+        t += duration + rng.randint(0, 200)
+    return words
+
+
+def old_find_matches(words):
+    swear_regex = re.compile('|'.join(OLD_SWEAR_PATTERNS), re.IGNORECASE)
+    return [(word.text, word.start, word.end) for word in words if swear_regex.search(word.text)]
+
+
+def best_time(fn, runs):
+    best = None
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark profanity detection on a long transcript")
+    parser.add_argument("--hours", type=float, default=3)
+    parser.add_argument("--runs", type=int, default=5, help="runs per matcher; the fastest is reported")
+    parser.add_argument("--language", default=DEFAULT_LANGUAGE)
+    parser.add_argument("--channel")
+    args = parser.parse_args()
+
+    words = make_transcript(args.hours)
+    print(f"Transcript: {args.hours:g} hours, {len(words)} words\n")
+
+    old_time, old_matches = best_time(lambda: old_find_matches(words), args.runs)
+    # A fresh matcher per run so the token memo starts cold, as it does for
+    # the first segment after a lexicon change
+    entries = get_matcher(args.language, args.channel).entries
+    cold_time, new_matches = best_time(lambda: ProfanityMatcher(entries).find_matches(words), args.runs)
+    matcher = get_matcher(args.language, args.channel)
+    matcher.find_matches(words)
+    warm_time, _ = best_time(lambda: matcher.find_matches(words), args.runs)
+
+    print(f"{'matcher':<22}{'seconds':>10}{'words/s':>14}{'matches':>10}")
+    for name, elapsed, matches in (
+        ("regex (old)", old_time, old_matches),
+        ("lexicon trie, cold", cold_time, new_matches),
+        ("lexicon trie, warm", warm_time, new_matches),
+    ):
+        print(f"{name:<22}{elapsed:>10.3f}{len(words) / elapsed:>14,.0f}{len(matches):>10}")
+
+    old_only = sorted({text for text, _, _ in old_matches} - {text for text, _, _ in new_matches})
+    new_only = sorted({text for text, _, _ in new_matches} - {text for text, _, _ in old_matches})
+    print(f"\nOnly matched by the old regex: {', '.join(old_only) or '-'}")
+    print(f"Only matched by the lexicon: {', '.join(new_only) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
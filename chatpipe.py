@@ -0,0 +1,85 @@
+import os
+import threading
+import uuid
+
+if os.name == "nt":
+    import _winapi
+
+PIPE_BUFFER_SIZE = 1024 * 1024
+
+
+class ChatPipe:
+    # A named pipe the chat renderer writes its frames into and this process
+    # reads back, so the render never touches the disk: a Windows named pipe
+    # (\\.\pipe\...) on Windows, a FIFO in temp_dir elsewhere. Create it
+    # before starting the writer, which opens path like any output file,
+    # then connect() and read() from one thread.
+    def __init__(self, temp_dir, extension=".nut"):
+        name = f"chat-render-{uuid.uuid4().hex}{extension}"
+        self.connected = threading.Event()
+        self.handle = None
+        self.fd = None
+        if os.name == "nt":
+            self.path = rf"\\.\pipe\{name}"
+            self.handle = _winapi.CreateNamedPipe(
+                self.path,
+                _winapi.PIPE_ACCESS_INBOUND | _winapi.FILE_FLAG_FIRST_PIPE_INSTANCE,
+                _winapi.PIPE_WAIT,  # Byte stream, blocking reads
+                1, PIPE_BUFFER_SIZE, PIPE_BUFFER_SIZE,
+                _winapi.NMPWAIT_WAIT_FOREVER, _winapi.NULL
+            )
+        else:
+            self.path = os.path.join(temp_dir, name)
+            os.mkfifo(self.path)
+
+    def connect(self):
+        # Blocks until the writer opens the pipe
+        try:
+            if self.handle is not None:
+                try:
+                    _winapi.ConnectNamedPipe(self.handle, False)
+                except OSError as e:
+                    # The writer got there first, and may even be done
+                    # already; what it wrote is still there to read
+                    if e.winerror not in (_winapi.ERROR_PIPE_CONNECTED, _winapi.ERROR_NO_DATA):
+                        raise
+            else:
+                self.fd = os.open(self.path, os.O_RDONLY)
+        finally:
+            self.connected.set()
+
+    def read(self, size=PIPE_BUFFER_SIZE):
+        # Returns b"" once the writer has closed its end
+        if self.handle is not None:
+            try:
+                data, _ = _winapi.ReadFile(self.handle, size)
+            except BrokenPipeError:
+                return b""
+            return data
+        return os.read(self.fd, size)
+
+    def release(self):
+        # Unblocks a connect() still waiting on a writer that exited without
+        # opening the pipe, by opening and closing it as the writer
+        if self.connected.is_set():
+            return
+        try:
+            if self.handle is not None:
+                open(self.path, "wb").close()
+            else:
+                os.close(os.open(self.path, os.O_WRONLY))
+        except OSError:
+            pass
+
+    def close(self):
+        if self.handle is not None:
+            _winapi.CloseHandle(self.handle)
+            self.handle = None
+        else:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
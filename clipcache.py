@@ -0,0 +1,176 @@
+import json
+import sqlite3
+import threading
+import time
+
+# How long a cached page is fresh, per GQL clips period. Top clips of all
+# time barely move, while the last 24 hours change every few minutes.
+PERIOD_TTLS = {
+    "LAST_DAY": 5 * 60,
+    "LAST_WEEK": 60 * 60,
+    "LAST_MONTH": 6 * 60 * 60,
+    "ALL_TIME": 24 * 60 * 60,
+}
+# How long past its TTL a page may still be served while it is refreshed in
+# the background (stale-while-revalidate)
+PERIOD_STALE_TTLS = {
+    "LAST_DAY": 60 * 60,
+    "LAST_WEEK": 24 * 60 * 60,
+    "LAST_MONTH": 3 * 24 * 60 * 60,
+    "ALL_TIME": 30 * 24 * 60 * 60,
+}
+DEFAULT_TTL = 60 * 60
+DEFAULT_STALE_TTL = 24 * 60 * 60
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+def page_state(period, fetched_at, ttls=PERIOD_TTLS, stale_ttls=PERIOD_STALE_TTLS):
+    # FRESH, STALE while it may still be served during a refresh, or None
+    # once a page fetched at fetched_at is too old to serve at all
+    age = time.time() - fetched_at
+    ttl = ttls.get(period, DEFAULT_TTL)
+    if age <= ttl:
+        return FRESH
+    if age <= ttl + stale_ttls.get(period, DEFAULT_STALE_TTL):
+        return STALE
+    return None
+
+
+class ClipCache:
+    # On-disk store of clip pages. Pages are keyed by (login, period, page
+    # size, start cursor) and hold the ids of their clips; the clip metadata
+    # itself lives once per clip id in the clips table.
+    def __init__(self, path="clip_cache.db", ttls=None, stale_ttls=None):
+        self.path = path
+        self.ttls = dict(PERIOD_TTLS, **(ttls or {}))
+        self.stale_ttls = dict(PERIOD_STALE_TTLS, **(stale_ttls or {}))
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    login TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    page_size INTEGER NOT NULL,
+                    cursor TEXT NOT NULL,
+                    clip_ids TEXT NOT NULL,
+                    end_cursor TEXT,
+                    has_next_page INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (login, period, page_size, cursor)
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS clips (
+                    id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at)")
+        self.prune()
+
+    def ttl(self, period):
+        return self.ttls.get(period, DEFAULT_TTL)
+
+    def stale_ttl(self, period):
+        return self.stale_ttls.get(period, DEFAULT_STALE_TTL)
+
+    def page_state(self, period, fetched_at):
+        return page_state(period, fetched_at, self.ttls, self.stale_ttls)
+
+    def get_page(self, login, period, page_size, cursor):
+        # Returns (clips, end_cursor, has_next_page, state, fetched_at) or None
+        # on a miss. state is FRESH, or STALE when the caller should revalidate.
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT clip_ids, end_cursor, has_next_page, fetched_at FROM pages "
+                "WHERE login = ? AND period = ? AND page_size = ? AND cursor = ?",
+                (login.lower(), period, page_size, cursor)
+            ).fetchone()
+            if row is None:
+                return None
+
+            clip_ids, end_cursor, has_next_page, fetched_at = row
+            state = self.page_state(period, fetched_at)
+            if state is None:
+                return None
+
+            clip_ids = json.loads(clip_ids)
+            clips = self.get_clips(clip_ids)
+            if len(clips) != len(clip_ids):
+                return None
+
+        return clips, end_cursor, bool(has_next_page), state, fetched_at
+
+    def get_clips(self, clip_ids):
+        # Caller holds self.lock
+        if not clip_ids:
+            return []
+        placeholders = ",".join("?" * len(clip_ids))
+        rows = self.conn.execute(f"SELECT id, data FROM clips WHERE id IN ({placeholders})", clip_ids).fetchall()
+        by_id = {clip_id: json.loads(data) for clip_id, data in rows}
+        return [by_id[clip_id] for clip_id in clip_ids if clip_id in by_id]
+
+    def get_clip(self, clip_id):
+        with self.lock:
+            clips = self.get_clips([clip_id])
+        return clips[0] if clips else None
+
+    def put_page(self, login, period, page_size, cursor, clips, end_cursor, has_next_page):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO clips (id, data, updated_at) VALUES (?, ?, ?)",
+                [(clip['id'], json.dumps(clip), now) for clip in clips]
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(login, period, page_size, cursor, clip_ids, end_cursor, has_next_page, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (login.lower(), period, page_size, cursor, json.dumps([clip['id'] for clip in clips]),
+                 end_cursor, int(has_next_page), now)
+            )
+
+    def prune(self):
+        # Drops pages too old to be served even as stale, then clips no page
+        # refers to any more
+        now = time.time()
+        with self.lock, self.conn:
+            for period in set(self.ttls) | set(self.stale_ttls):
+                self.conn.execute(
+                    "DELETE FROM pages WHERE period = ? AND fetched_at < ?",
+                    (period, now - self.ttl(period) - self.stale_ttl(period))
+                )
+            self.conn.execute("""
+                DELETE FROM clips WHERE id NOT IN (
+                    SELECT DISTINCT value FROM pages, json_each(pages.clip_ids)
+                )
+            """)
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM pages")
+            self.conn.execute("DELETE FROM clips")
+
+
+clip_cache = None
+clip_cache_lock = threading.Lock()
+
+
+def get_clip_cache():
+    # Opens the shared cache on first use. Returns None if the database can't
+    # be opened, in which case clips are always fetched from Twitch.
+    global clip_cache
+    with clip_cache_lock:
+        if clip_cache is None:
+            try:
+                clip_cache = ClipCache()
+            except sqlite3.Error as e:
+                print(f"Clip cache unavailable: {e}")
+                clip_cache = False
+        return clip_cache or None
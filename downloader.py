@@ -3,19 +3,39 @@ import concurrent.futures
 import threading
 import os
 import json
-import time
-import queue
 from queue import Queue
 import shutil
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from utils import is_valid_time, format_time
+from utils import is_valid_time, format_time, merge_intervals
 import assemblyai as aai
 import re
 import logging
 import traceback
+import contextlib
+from scheduler import Stage, StageScheduler, chain
+from transcription import TranscriptionService, plan_chunks, probe_duration, scan_audio
+from profanity import DEFAULT_LANGUAGE, get_matcher
+from transcriptcache import TranscriptWord, audio_hash, get_transcript_cache
+from overlaycodecs import DEFAULT_OVERLAY_CODEC, get_overlay_codec, overlay_input_args
+from chatpipe import ChatPipe
+# Assumed when a video can't be probed
+DEFAULT_VIDEO_SIZE = (1920, 1080)
+# Filter graphs longer than this are passed to ffmpeg in a script file
+MAX_INLINE_FILTER_LENGTH = 4000
 # Replace with your API key
 aai.settings.api_key = os.getenv("ASSEMBLY_API_KEY")
+# Point at fake_transcription_server.py to run without AssemblyAI
+aai.settings.base_url = os.getenv("ASSEMBLY_BASE_URL", aai.settings.base_url)
+
+
+class JobOutput:
+    # Where a job's progress goes: the text box and progress bar of the window
+    # that submitted it. Jobs from different windows can run at the same time,
+    # so each carries its own instead of sharing the downloader's.
+    def __init__(self, output_text=None, progress_bar=None):
+        self.output_text = output_text
+        self.progress_bar = progress_bar
 
 
 class TwitchDownloader:
@@ -32,14 +52,45 @@ class TwitchDownloader:
         self.bulk_download_clips_button = None
         self.output_text = None
         self.progress_bar = None
+        # Jobs waiting to be admitted into the scheduler. The queue and its
+        # dispatcher live as long as the downloader, so batches submitted
+        # while another batch runs share the same capacity instead of
+        # starting their own.
         self.processing_queue = Queue()
-        self.render_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)  # Adjust max_workers as needed
-        self.render_lock = threading.Lock()
-        self.processing_thread = None
+        self.in_flight = {}  # Job key -> Future, for jobs queued or running
+        self.in_flight_lock = threading.Lock()
+        self.dispatcher = None
+        # Admitted jobs still in their network stages, and jobs past them that
+        # wait on transcription or an encode slot
+        self.admission = threading.Condition()
+        self.jobs_downloading = 0
+        self.jobs_past_network = 0
+        # The JobOutput of the job a thread is working for, see use_output()
+        self.local = threading.local()
+        # Serializes progress output only; encoding itself is bounded by the
+        # number of encode slots
+        self.log_lock = threading.Lock()
         self.settings_file = "settings.json"
         loaded_settings = self.load_settings()
         self.chat_settings = loaded_settings["chat_settings"]
         self.max_workers = loaded_settings["max_workers"]
+        self.thumbnail_cache_settings = loaded_settings["thumbnail_cache"]
+        self.encode_slots = loaded_settings["encode_slots"]
+        self.mute_padding_ms = loaded_settings["mute_padding_ms"]
+        self.profanity_language = loaded_settings["profanity_language"]
+        self.max_transcriptions_in_flight = loaded_settings["max_transcriptions_in_flight"]
+        self.transcription_chunk_seconds = loaded_settings["transcription_chunk_seconds"]
+        # Transcripts are processed by AssemblyAI, not here, so they are
+        # waited on by the service's poller instead of the "api" workers
+        self.transcription_service = TranscriptionService(self.max_transcriptions_in_flight)
+        # Every clip or VOD segment runs as a DAG of stages; each kind of stage
+        # has its own pool: downloads on "network", chat render and ffmpeg on
+        # "encode", transcription on "api"
+        self.scheduler = StageScheduler({
+            "network": self.max_workers,
+            "encode": self.encode_slots,
+            "api": self.max_workers,
+        })
 
     def load_settings(self):
         default_settings = {
@@ -49,9 +100,20 @@ class TwitchDownloader:
                 "chat_width": 0.2388888888888889,
                 "chat_height": 0.6123456790123457,
                 "font_size": 24,
-                "background_color": "40808080"
+                "background_color": "40808080",
+                "stream_chat_render": False,
+                "overlay_codec": DEFAULT_OVERLAY_CODEC
             },
-            "max_workers": 3
+            "max_workers": 3,
+            "encode_slots": 2,
+            "mute_padding_ms": 100,
+            "profanity_language": DEFAULT_LANGUAGE,
+            "max_transcriptions_in_flight": 8,
+            "transcription_chunk_seconds": 600,
+            "thumbnail_cache": {
+                "max_disk_mb": 200,
+                "max_memory_items": 300
+            }
         }
         try:
             with open(self.settings_file, "r") as f:
@@ -67,7 +129,13 @@ class TwitchDownloader:
     def save_settings(self):
         settings = {
             "chat_settings": self.chat_settings,
-            "max_workers": self.max_workers
+            "max_workers": self.max_workers,
+            "encode_slots": self.encode_slots,
+            "mute_padding_ms": self.mute_padding_ms,
+            "profanity_language": self.profanity_language,
+            "max_transcriptions_in_flight": self.max_transcriptions_in_flight,
+            "transcription_chunk_seconds": self.transcription_chunk_seconds,
+            "thumbnail_cache": self.thumbnail_cache_settings
         }
         with open(self.settings_file, "w") as f:
             json.dump(settings, f, indent=4)
@@ -78,7 +146,33 @@ class TwitchDownloader:
 
     def set_max_workers(self, workers):
         self.max_workers = workers
+        self.scheduler.resize("network", workers)
+        self.scheduler.resize("api", workers)
+        with self.admission:
+            self.admission.notify_all()
+        self.save_settings()
+
+    def set_encode_slots(self, slots):
+        self.encode_slots = slots
+        self.scheduler.resize("encode", slots)
+        with self.admission:
+            self.admission.notify_all()
         self.save_settings()
+
+    def set_max_transcriptions_in_flight(self, count):
+        self.max_transcriptions_in_flight = count
+        self.transcription_service.set_max_in_flight(count)
+        self.save_settings()
+
+    def encode_threads(self):
+        # Splits the machine's cores between the encode slots, so concurrent
+        # ffmpeg runs together roughly use every core without oversubscribing
+        return max(1, (os.cpu_count() or 1) // max(1, self.encode_slots))
+
+    def can_stream_chat_render(self):
+        # Off unless turned on; otherwise the chat renders to an intermediate
+        # file in the chosen overlay codec
+        return self.chat_settings.get("stream_chat_render", False)
     #MIGHT BE REDUNDANT
     def set_progress_bar(self, progress_bar):
         self.progress_bar = progress_bar
@@ -86,157 +180,422 @@ class TwitchDownloader:
     def set_output_text(self, output_text):
         self.output_text = output_text
 
-    def bulk_download_clips(self, clips, download_dir, username):
-        self.processing_queue = queue.Queue()
-        for clip in clips:
-            self.processing_queue.put((clip, download_dir, username))
-        
-        self.processing_thread = threading.Thread(target=self.process_queue)
-        self.processing_thread.start()
-        
-        # Wait for the processing to complete, but with a timeout
-        start_time = time.time()
-        while self.processing_thread.is_alive():
-            if time.time() - start_time > 3600:  # 1 hour timeout
-                self.safe_output_text_insert("Bulk download timed out after 1 hour\n")
-                break
-            time.sleep(1)
-        
-        self.safe_output_text_insert("Bulk download completed or timed out\n")
-
-
-    def process_queue(self):
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = []
-            while not self.processing_queue.empty():
-                try:
-                    clip, download_dir, username = self.processing_queue.get(block=False)
-                    future = executor.submit(self.download_and_process_clip, clip, download_dir, username)
-                    futures.append(future)
-                except queue.Empty:
-                    break
-            
-            for future in concurrent.futures.as_completed(futures):
-                try:
-                    future.result()  # This will raise any exceptions that occurred during processing
-                except Exception as e:
-                    self.output_text.insert(tk.END, f"Error processing clip: {str(e)}\n")
-                    self.output_text.see(tk.END)
+    def bulk_download_clips(self, clips, download_dir, username, output=None):
+        with self.use_output(output):
+            futures = [self.submit_clip(clip, download_dir, username, output) for clip in clips]
 
+            # Wait for the processing to complete, but with a timeout
+            done, not_done = concurrent.futures.wait(futures, timeout=3600)  # 1 hour timeout
+            if not_done:
+                self.safe_output_text_insert("Bulk download timed out after 1 hour\n")
 
+            self.safe_output_text_insert("Bulk download completed or timed out\n")
+
+    def submit_clip(self, clip, download_dir, username, output=None):
+        # Thread-safe; returns a Future that resolves when the clip is done.
+        # The clip's progress goes to output (a JobOutput), or the main window.
+        key = ("clip", clip.get('slug') or clip['id'], os.path.abspath(download_dir))
+        return self.submit_job(key, output, self.download_and_process_clip, clip, download_dir, username)
+
+    def submit_vod_segment(self, i, timestamp, vod_url, download_dir, output=None):
+        # Thread-safe; returns a Future that resolves when the segment is done
+        key = ("segment", vod_url, timestamp, os.path.abspath(download_dir))
+        return self.submit_job(key, output, self.process_vod_segment, i, timestamp, vod_url, download_dir)
+
+    def submit_job(self, key, output, start_job, *args):
+        # A job already queued or running for the same key is not started a
+        # second time; its Future is returned instead
+        with self.in_flight_lock:
+            if key in self.in_flight:
+                return self.in_flight[key]
+            future = concurrent.futures.Future()
+            self.in_flight[key] = future
+            self.processing_queue.put((key, future, output, start_job, args))
+            if self.dispatcher is None:
+                self.dispatcher = threading.Thread(target=self.run_dispatcher, daemon=True)
+                self.dispatcher.start()
+        return future
+
+    def max_jobs_past_network(self):
+        # Downloaded jobs allowed to wait for their transcription and encode
+        # stages: enough to keep every encode slot busy with one more queued,
+        # plus a round of downloads, without downloading a whole batch ahead
+        return self.max_workers + 2 * self.encode_slots
+
+    def run_dispatcher(self):
+        # Admits queued jobs by stage capacity rather than a worker per job: a
+        # job starts when there is a network slot for its downloads and not
+        # too many downloaded jobs are waiting, so later jobs download while
+        # earlier ones transcribe, render and combine
+        while True:
+            key, future, output, start_job, args = self.processing_queue.get()
+            with self.admission:
+                while (self.jobs_downloading >= self.max_workers
+                       or self.jobs_past_network >= self.max_jobs_past_network()):
+                    self.admission.wait()
+                self.jobs_downloading += 1
+            self.admit_job(key, future, output, start_job, args)
+
+    def admit_job(self, key, future, output, start_job, args):
+        phase = {"network": True}
+
+        def on_kind_done(kind):
+            if kind != "network":
+                return
+            with self.admission:
+                if phase["network"]:
+                    phase["network"] = False
+                    self.jobs_downloading -= 1
+                    self.jobs_past_network += 1
+                    self.admission.notify_all()
+
+        def finished(job):
+            with self.admission:
+                if phase["network"]:
+                    self.jobs_downloading -= 1
+                else:
+                    self.jobs_past_network -= 1
+                self.admission.notify_all()
+            with self.in_flight_lock:
+                self.in_flight.pop(key, None)
+            try:
+                job.result()
+                future.set_result(None)
+            except Exception as e:
+                with self.use_output(output):
+                    self.safe_output_text_insert(f"Error processing job: {str(e)}\n")
+                future.set_exception(e)
 
-    def transcribe_audio(self, audio_file):
         try:
-            transcriber = aai.Transcriber()
-            transcript = transcriber.transcribe(audio_file)
-            
-            if transcript.status == aai.TranscriptStatus.error:
-                self.safe_output_text_insert(f"Transcription error: {transcript.error}\n")
-                return None, []
-            
-            swear_patterns = [
-                r'\bf[u\*]+ck',
-                r'\bsh[i\*]+t',
-                r'\bd[a\*]+mn',
-                r'\bb[i\*]+tch',
-                r'\ba[s\*]+',
-                r'\bmotherfuck',
-                r'\bretard(?:s|ed)?',
-                r'\bcunts?',
-                r'\bd[i\*]+ck',
-                r'\bp[e\*]+nis',
-            ]
-            swear_regex = re.compile('|'.join(swear_patterns), re.IGNORECASE)
-            swear_timestamps = []
-
-            for word in transcript.words:
-                if swear_regex.search(word.text):
-                    swear_timestamps.append((word.text, word.start, word.end))
-            
-            return transcript, swear_timestamps
+            with self.use_output(output):
+                job = start_job(*args, output=output, on_kind_done=on_kind_done)
+        except Exception as e:
+            job = concurrent.futures.Future()
+            job.set_exception(e)
+        job.add_done_callback(finished)
+
+    def current_output(self):
+        # The JobOutput of the job this thread is working for, or the main
+        # window's text box and progress bar
+        output = getattr(self.local, "output", None)
+        return output if output is not None else JobOutput(self.output_text, self.progress_bar)
+
+    @contextlib.contextmanager
+    def use_output(self, output):
+        # Sends this thread's progress to output until the block ends
+        previous = getattr(self.local, "output", None)
+        self.local.output = output if output is not None else previous
+        try:
+            yield
+        finally:
+            self.local.output = previous
+
+    def bind_output(self, output, fn):
+        # Wraps fn so its progress goes to output on whichever thread runs it
+        def run(*args):
+            with self.use_output(output):
+                return fn(*args)
+        return run
+
+
+    def transcribe_audio(self, audio_file, channel=None):
+        return self.transcribe_audio_async(audio_file, channel).result()
+
+    def transcribe_audio_async(self, audio_file, channel=None, chunked=False):
+        # Returns a Future of (transcript, swear_timestamps). Transcripts are
+        # cached by a hash of the decoded audio, so re-running a batch only
+        # transcribes audio that changed; on a cache hit, or when the audio
+        # was chunked, the transcript is a list of timed words. The audio is
+        # hashed and uploaded on the calling thread, then the transcription
+        # service waits for the transcript.
+        done = concurrent.futures.Future()
+        # The transcript finishes on the service's poller thread; log there
+        # to the same place as the calling job
+        output = getattr(self.local, "output", None)
+        try:
+            # Lexicons are compiled once per language and channel and shared
+            # by every job
+            matcher = get_matcher(self.profanity_language, channel)
+            cache = get_transcript_cache()
+            audio_key = None
+            chunks = None
+            if chunked:
+                # Only recordings long enough to be split need their silences,
+                # and the container knows the duration without decoding. For
+                # those, the cache key comes from the same decode.
+                duration = probe_duration(audio_file)
+                if duration and duration > self.transcription_chunk_seconds * 1.5:
+                    audio_key, duration, silences = scan_audio(audio_file)
+                    chunks = plan_chunks(duration, silences, self.transcription_chunk_seconds)
+            if audio_key is None:
+                audio_key = audio_hash(audio_file)
+            if audio_key:
+                words = cache.get_words(audio_key)
+                if words is not None:
+                    swear_timestamps = cache.get_swears(audio_key, matcher.version)
+                    if swear_timestamps is None:
+                        swear_timestamps = matcher.find_matches(words)
+                        cache.put(audio_key, words, matcher.version, swear_timestamps)
+                    self.safe_output_text_insert(f"Using cached transcript for {os.path.basename(audio_file)}\n")
+                    done.set_result((words, swear_timestamps))
+                    return done
+
+            if chunks is not None and len(chunks) > 1:
+                self.transcribe_chunks(audio_file, chunks, matcher, audio_key, done, output)
+                return done
+
+            upload_url = self.upload_audio(audio_file)
         except Exception as e:
             self.safe_output_text_insert(f"Transcription failed: {str(e)}\n")
-            return None, []
-
-    def download_vod_segments(self, vod_url, timestamps, download_dir):
+            done.set_result((None, []))
+            return done
+
+        def finish(future):
+            # Runs on the service's poller thread once the transcript is done
+            try:
+                transcript = future.result()
+                swear_timestamps = matcher.find_matches(transcript.words or [])
+                if audio_key:
+                    cache.put(audio_key, transcript.words or [], matcher.version, swear_timestamps)
+                done.set_result((transcript, swear_timestamps))
+            except concurrent.futures.CancelledError:
+                self.safe_output_text_insert(f"Transcription cancelled: {os.path.basename(audio_file)}\n")
+                done.set_result((None, []))
+            except Exception as e:
+                self.safe_output_text_insert(f"Transcription failed: {str(e)}\n")
+                done.set_result((None, []))
+
+        self.transcription_service.submit(upload_url).add_done_callback(self.bind_output(output, finish))
+        return done
+
+    def transcribe_chunks(self, audio_file, chunks, matcher, audio_key, done, output=None):
+        # Transcribes a long recording as chunks that AssemblyAI works on side
+        # by side. Each chunk is submitted as soon as it is uploaded and its
+        # words are shifted back to recording time as it finishes. The swear
+        # words are found once every chunk is in, since muting needs them
+        # all anyway, and done resolves.
+        name = os.path.basename(audio_file)
+        results = [None] * len(chunks)
+        lock = threading.Lock()
+        state = {"remaining": len(chunks), "failed": False}
+
+        def finish_chunk(index, future):
+            chunk = chunks[index]
+            try:
+                transcript = future.result()
+                offset = int(chunk.upload_start * 1000)
+                words = []
+                for word in transcript.words or []:
+                    start, end = word.start + offset, word.end + offset
+                    # Overlapping audio is transcribed twice; keep each word
+                    # only in the chunk its midpoint falls in
+                    if chunk.start * 1000 <= (start + end) / 2 < chunk.end * 1000:
+                        words.append(TranscriptWord(word.text, start, end))
+                results[index] = words
+                self.safe_output_text_insert(f"Transcribed part {index + 1}/{len(chunks)} of {name}\n")
+            except Exception as e:
+                with lock:
+                    first_failure = not state["failed"]
+                    state["failed"] = True
+                if first_failure:
+                    if isinstance(e, concurrent.futures.CancelledError):
+                        self.safe_output_text_insert(f"Transcription cancelled: {name}\n")
+                    else:
+                        self.safe_output_text_insert(f"Transcription failed: {str(e)}\n")
+
+            with lock:
+                state["remaining"] -= 1
+                if state["remaining"]:
+                    return
+            if state["failed"]:
+                done.set_result((None, []))
+                return
+            words = [word for chunk_words in results for word in chunk_words]
+            swear_timestamps = matcher.find_matches(words)
+            if audio_key:
+                get_transcript_cache().put(audio_key, words, matcher.version, swear_timestamps)
+            done.set_result((words, swear_timestamps))
+
+        self.safe_output_text_insert(f"Transcribing {name} in {len(chunks)} parts\n")
+        for index, chunk in enumerate(chunks):
+            try:
+                upload_url = self.upload_audio(audio_file, chunk.upload_start, chunk.upload_end)
+                future = self.transcription_service.submit(upload_url)
+            except Exception as e:
+                future = concurrent.futures.Future()
+                future.set_exception(e)
+            future.add_done_callback(self.bind_output(output, lambda f, index=index: finish_chunk(index, f)))
+
+    def upload_audio(self, media_file, start=None, end=None):
+        # Uploads a mono 16 kHz Opus extract of the audio instead of the whole
+        # video, a small fraction of the bytes. ffmpeg's output is streamed
+        # straight into the upload, so the extract never touches the disk.
+        # start and end (seconds) limit it to part of the recording. Returns
+        # the upload URL to transcribe.
+        trim = []
+        if start:
+            trim += ["-ss", f"{start:.3f}"]
+        if end is not None:
+            trim += ["-to", f"{end:.3f}"]
+        command = [
+            "ffmpeg", "-v", "error",
+            *trim,
+            "-i", media_file,
+            "-map", "0:a:0",
+            "-ac", "1",
+            "-ar", "16000",
+            "-c:a", "libopus",
+            "-b:a", "24k",
+            "-application", "voip",
+            "-f", "ogg",
+            "-"
+        ]
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            chunks = iter(lambda: process.stdout.read(64 * 1024), b"")
+            upload_url = aai.api.upload_file(aai.Client.get_default().http_client, chunks)
+        finally:
+            # Closing the pipe also stops ffmpeg if the upload failed
+            process.stdout.close()
+            errors = process.stderr.read().decode(errors="replace").strip()
+            rc = process.wait()
+        if rc != 0:
+            raise RuntimeError(f"Extracting audio from {media_file} failed: {errors}")
+        return upload_url
+
+    def download_vod_segments(self, vod_url, timestamps, download_dir, output=None):
+        with self.use_output(output):
+            self.wait_for_vod_segments(vod_url, timestamps, download_dir, output)
+
+    def wait_for_vod_segments(self, vod_url, timestamps, download_dir, output):
         try:
             logging.debug(f"Starting download_vod_segments with {len(timestamps)} timestamps")
-            self.processing_queue = queue.Queue()
-            for i, timestamp in enumerate(timestamps, 1):
-                self.processing_queue.put((i, timestamp, vod_url, download_dir))
-            
-            self.process_vod_segments_queue()
+            futures = [
+                self.submit_vod_segment(i, timestamp, vod_url, download_dir, output)
+                for i, timestamp in enumerate(timestamps, 1)
+            ]
         except Exception as e:
             logging.error(f"Error in download_vod_segments: {str(e)}")
             logging.error(traceback.format_exc())
             self.safe_output_text_insert(f"Error starting VOD segment download: {str(e)}\n")
             messagebox.showerror("Error", f"An error occurred while starting the download: {str(e)}")
+            return
+
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()  # This will raise any exceptions that occurred during processing
+            except Exception as e:
+                logging.error(f"Error processing segment: {str(e)}")
+                self.safe_output_text_insert(f"Error processing segment: {str(e)}\n")
+
+        self.safe_output_text_insert("All VOD segments have been processed.\n")
+        messagebox.showinfo("Download Complete", "All VOD segments have been downloaded and processed.")
+
+    def process_vod_segment(self, i, timestamp, vod_url, download_dir, output=None, on_kind_done=None):
+        # Submits the segment as a job and returns a Future that resolves once
+        # it is finished and its temporary directory is cleaned up
+        logging.debug(f"Processing segment {i}: {timestamp}")
+        start_time, end_time = timestamp.split('-')
+        temp_dir = os.path.join(download_dir, f"temp_segment_{i}")
+        os.makedirs(temp_dir, exist_ok=True)
 
-    def process_vod_segments_queue(self):
-        try:
-            logging.debug("Starting process_vod_segments_queue")
-            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                futures = []
-                while not self.processing_queue.empty():
-                    try:
-                        segment_info = self.processing_queue.get(block=False)
-                        future = executor.submit(self.process_vod_segment, *segment_info)
-                        futures.append(future)
-                    except queue.Empty:
-                        break
-                
-                for future in concurrent.futures.as_completed(futures):
-                    try:
-                        future.result()  # This will raise any exceptions that occurred during processing
-                    except Exception as e:
-                        logging.error(f"Error processing segment: {str(e)}")
-                        logging.error(traceback.format_exc())
-                        self.safe_output_text_insert(f"Error processing segment: {str(e)}\n")
-
-            self.safe_output_text_insert("All VOD segments have been processed.\n")
-            messagebox.showinfo("Download Complete", "All VOD segments have been downloaded and processed.")
-        except Exception as e:
-            logging.error(f"Error in process_vod_segments_queue: {str(e)}")
-            logging.error(traceback.format_exc())
-            self.safe_output_text_insert(f"Error processing VOD segments: {str(e)}\n")
-            messagebox.showerror("Error", f"An error occurred while processing VOD segments: {str(e)}")
-
+        output_file = os.path.join(temp_dir, f"segment_{i}.mp4")
+        chat_output = os.path.join(temp_dir, f"segment_{i}_chat.json")
+        combined_output = os.path.join(download_dir, f"segment_{i}_combined.mp4")
 
-    def process_vod_segment(self, i, timestamp, vod_url, download_dir):
-        temp_dir = None
-        try:
-            logging.debug(f"Processing segment {i}: {timestamp}")
-            start_time, end_time = timestamp.split('-')
-            temp_dir = os.path.join(download_dir, f"temp_segment_{i}")
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            # Download video segment
-            output_file = os.path.join(temp_dir, f"segment_{i}.mp4")
+        def download_video():
             self.download_vod_segment(vod_url, start_time, end_time, output_file)
+            return output_file
 
-            # Download chat
-            chat_output = os.path.join(temp_dir, f"segment_{i}_chat.json")
+        def download_chat():
             self.download_vod_chat(vod_url, start_time, end_time, chat_output)
+            return chat_output
+
+        # Long segments are split into chunks transcribed side by side
+        return self.submit_media_job(
+            f"segment {i}", temp_dir, combined_output, download_video, download_chat,
+            lambda chat_file, video_size: self.render_chat(chat_file, temp_dir, f"segment_{i}", video_size),
+            lambda video_file, render_output, swear_timestamps, video_size: self.combine_vod_and_chat(
+                video_file, render_output, combined_output, swear_timestamps, video_size),
+            chunked=True, output=output, on_kind_done=on_kind_done
+        )
 
-            # Transcribe audio and detect swear words
-            transcript, swear_timestamps = self.transcribe_audio(output_file)
-
-            # Render chat
-            render_future = self.render_pool.submit(self.render_chat, chat_output, temp_dir, f"segment_{i}")
-            
+    def submit_media_job(self, title, temp_dir, combined_output, download, download_chat, render, combine,
+                         channel=None, chunked=False, output=None, on_kind_done=None):
+        # Runs a clip or VOD segment as a job of stages. download() returns
+        # the video file and download_chat() the chat file; render(chat_file,
+        # video_size) renders the chat to a file and combine(video_file,
+        # render_output, swear_timestamps, video_size) puts it on the video
+        # as combined_output. Returns a Future that resolves once the job is
+        # finished and temp_dir is cleaned up.
+        def fetch_chat():
+            chat_file = download_chat()
+            # A chat without messages has nothing to overlay
+            return chat_file if self.chat_has_comments(chat_file) else None
+
+        def transcribe(video_file):
+            # Transcribe audio and detect swear words. Returns a Future, so the
+            # stage doesn't hold an "api" worker while AssemblyAI works.
+            return chain(self.transcribe_audio_async(video_file, channel, chunked), lambda result: result[1])
+
+        def render_stage(chat_file, video_size):
+            if chat_file is None:
+                return None
+            return render(chat_file, video_size)
+
+        def combine_stage(video_file, video_size, render_output, swear_timestamps):
             # Combine video and chat, and mute swear words
-            combined_output = os.path.join(download_dir, f"segment_{i}_combined.mp4")
-            self.wait_and_combine_vod(render_future, output_file, combined_output, swear_timestamps)
-
-            self.safe_output_text_insert(f"Completed processing segment {i}\n")
-        except Exception as e:
-            logging.error(f"Error processing segment {i}: {str(e)}")
-            logging.error(traceback.format_exc())
-            self.safe_output_text_insert(f"Error processing segment {i}: {str(e)}\n")
-        finally:
-            # Clean up temporary directory
-            if temp_dir and os.path.exists(temp_dir):
+            if render_output is None:
+                self.combine_without_chat(video_file, combined_output, swear_timestamps, title)
+            else:
+                combine(video_file, render_output, swear_timestamps, video_size)
+
+        def overlay(video_file, video_size, chat_file):
+            return self.stream_chat_overlay(video_file, chat_file, temp_dir, title, video_size)
+
+        def mute(video_file, overlaid_file, swear_timestamps):
+            self.finish_chat_overlay(video_file, overlaid_file, combined_output, swear_timestamps, title)
+
+        # The video and chat download side by side and the chat renders while
+        # the audio is transcribed. Streamed, the chat renders straight into
+        # an overlaid copy of the video, and the swear words are muted in it
+        # once they are known; otherwise the chat renders to a file and
+        # combine waits for it and the transcript.
+        stages = [
+            Stage("download", "network", download),
+            Stage("chat", "network", fetch_chat),
+            Stage("probe", "network", self.probe_video, deps=["download"]),
+            Stage("transcribe", "api", transcribe, deps=["download"]),
+        ]
+        if self.can_stream_chat_render():
+            stages.append(Stage("overlay", "encode", overlay, deps=["download", "probe", "chat"]))
+            stages.append(Stage("combine", "encode", mute, deps=["download", "overlay", "transcribe"]))
+        else:
+            stages.append(Stage("render", "encode", render_stage, deps=["chat", "probe"]))
+            stages.append(Stage("combine", "encode", combine_stage, deps=["download", "probe", "render", "transcribe"]))
+        stages = [Stage(stage.name, stage.kind, self.bind_output(output, stage.fn), stage.deps) for stage in stages]
+        job = self.scheduler.submit_job(stages, name=title, on_kind_done=on_kind_done)
+
+        done = concurrent.futures.Future()
+
+        def finish(job):
+            try:
+                job.result()
+                with self.log_lock:
+                    self.safe_output_text_insert(f"Completed processing: {title}\n")
+            except Exception as e:
+                logging.error(f"Error processing {title}: {str(e)}")
+                logging.error(traceback.format_exc())
+                with self.log_lock:
+                    self.safe_output_text_insert(f"Error processing {title}: {str(e)}\n")
+            finally:
+                # The job only finishes once none of its stages are running,
+                # so nothing is still writing to the temporary directory
                 shutil.rmtree(temp_dir, ignore_errors=True)
+                done.set_result(None)
+
+        job.add_done_callback(self.bind_output(output, finish))
+        return done
 
 
     def download_vod_segment(self, vod_url, start_time, end_time, output_file):
@@ -260,24 +619,16 @@ class TwitchDownloader:
         ]
         self.run_command(command, f"Downloading chat ({start_time} to {end_time})")
 
-    def wait_and_combine_vod(self, render_future, video_file, combined_output, swear_timestamps):
-        render_output = render_future.result()
-        x = int(self.chat_settings["chat_x"] * 1920)
-        y = int(self.chat_settings["chat_y"] * 1080)
-        
-        # Generate mute filter for swear words
-        mute_filter = self.generate_mute_filter(swear_timestamps)
-        
+    def combine_vod_and_chat(self, video_file, render_output, combined_output, swear_timestamps, video_size):
         combine_command = [
             "ffmpeg",
             "-i", video_file,
+            *overlay_input_args(render_output),
             "-i", render_output,
-            "-filter_complex",
-            f"[1:v]scale={int(self.chat_settings['chat_width'] * 1920)}:{int(self.chat_settings['chat_height'] * 1080)}[chat];"
-            f"[0:v][chat]overlay={x}:{y}[v];"
-            f"{mute_filter}",
-            "-map", "[v]",
-            "-map", "[aout]",
+            *self.filter_complex_args(self.chat_overlay_filter(swear_timestamps, video_size), os.path.dirname(video_file)),
+            "-map", "[vout]",
+            *self.audio_output_args(swear_timestamps),
+            "-threads", str(self.encode_threads()),
             combined_output
         ]
         self.run_command(combine_command, f"Combining video and chat")
@@ -289,7 +640,9 @@ class TwitchDownloader:
         else:
             print("Warning: Progress bar not initialized")  # Or use logging.warning()
 
-    def download_and_process_clip(self, clip, download_dir, username):
+    def download_and_process_clip(self, clip, download_dir, username, output=None, on_kind_done=None):
+        # Submits the clip as a job and returns a Future that resolves once it
+        # is finished and its temporary directory is cleaned up
         if 'slug' in clip:
             slug = clip['slug']
             clip_id = f"https://clips.twitch.tv/{slug}"
@@ -302,33 +655,17 @@ class TwitchDownloader:
         
         temp_dir = os.path.join(download_dir, f"temp_{safe_title}")
         os.makedirs(temp_dir, exist_ok=True)
-
-        try:
-            # Download clip and chat
-            clip_output = self.download_clip(clip_id, temp_dir, safe_title)
-            chat_output = self.download_chat(clip_id, temp_dir, safe_title)
-
-            # Transcribe audio and detect swear words
-            transcript, swear_timestamps = self.transcribe_audio(clip_output)
-
-            # Submit render and combine tasks to the thread pool
-            render_future = self.render_pool.submit(self.render_chat, chat_output, temp_dir, safe_title)
-            combine_future = self.render_pool.submit(self.wait_and_combine, render_future, clip_output, download_dir, safe_title, clip_title, swear_timestamps)
-
-            # Wait for the combine task to complete with a timeout
-            combine_future.result(timeout=600)  # 10 minutes timeout
-
-            with self.render_lock:
-                self.safe_output_text_insert(f"Completed processing: {clip_title}\n\n")
-        except concurrent.futures.TimeoutError:
-            with self.render_lock:
-                self.safe_output_text_insert(f"Timeout while processing {clip_title}\n\n")
-        except Exception as e:
-            with self.render_lock:
-                self.safe_output_text_insert(f"Error processing {clip_title}: {str(e)}\n\n")
-        finally:
-            # Clean up temporary directory
-            shutil.rmtree(temp_dir, ignore_errors=True)
+        combined_output = os.path.join(download_dir, f"{safe_title}_combined.mp4")
+
+        return self.submit_media_job(
+            clip_title, temp_dir, combined_output,
+            lambda: self.download_clip(clip_id, temp_dir, safe_title),
+            lambda: self.download_chat(clip_id, temp_dir, safe_title),
+            lambda chat_file, video_size: self.render_chat(chat_file, temp_dir, safe_title, video_size),
+            lambda clip_output, render_output, swear_timestamps, video_size: self.combine_clip_and_chat(
+                clip_output, render_output, combined_output, clip_title, swear_timestamps, video_size),
+            channel=username, output=output, on_kind_done=on_kind_done
+        )
 
     
     # def download_vod(self):
@@ -401,57 +738,252 @@ class TwitchDownloader:
         self.run_command(chat_command, f"Downloading Chat: {safe_title}")
         return chat_output
 
-    def render_chat(self, chat_output, temp_dir, safe_title):
-        render_output = os.path.join(temp_dir, f"{safe_title}_chat_render.mov")
-        render_command = [
+    def chat_render_command(self, chat_output, render_output, output_args, video_size):
+        _, _, width, height = self.overlay_geometry(video_size)
+        # The font size is set for 1080p; scale it with the video like the
+        # overlay, so the chat looks the same at any resolution
+        font_size = max(1, round(self.chat_settings["font_size"] * video_size[1] / DEFAULT_VIDEO_SIZE[1]))
+        return [
             "TwitchDownloaderCLI", "chatrender",
             "-i", chat_output,
             "-o", render_output,
-            "--font-size", str(int(self.chat_settings["font_size"])),
-            "--chat-width", str(int(self.chat_settings["chat_width"] * 1920)),
-            "--chat-height", str(int(self.chat_settings["chat_height"] * 1080)),
+            "--font-size", str(font_size),
+            "--chat-width", str(width),
+            "--chat-height", str(height),
             "--framerate", "12",
             "--background-color", "#"+str(self.chat_settings["background_color"]),
-            "--output-args=-c:v prores_ks -pix_fmt argb \"{save_path}\""
+            f"--output-args={output_args}"
         ]
+
+    def render_chat(self, chat_output, temp_dir, safe_title, video_size):
+        codec = get_overlay_codec(self.chat_settings.get("overlay_codec", DEFAULT_OVERLAY_CODEC))
+        render_output = os.path.join(temp_dir, f"{safe_title}_chat_render{codec['extension']}")
+        render_command = self.chat_render_command(chat_output, render_output, f"{codec['output_args']} \"{{save_path}}\"", video_size)
         self.run_command_shelled(render_command, f"Rendering Chat: {safe_title}")
         return render_output
 
-    def wait_and_combine(self, render_future, clip_output, download_dir, safe_title, clip_title, swear_timestamps):
+    def probe_video(self, video_file):
+        # Returns the (width, height) of the video's first stream. Probed once
+        # per job so the chat can be rendered at the size it is composited at.
+        command = [
+            "ffprobe", "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=width,height",
+            "-of", "json",
+            video_file
+        ]
         try:
-            render_output = render_future.result(timeout=300)  # 5 minutes timeout
-            combined_output = os.path.join(download_dir, f"{safe_title}_combined.mp4")
-            self.combine_clip_and_chat(clip_output, render_output, combined_output, clip_title, swear_timestamps)
-        except concurrent.futures.TimeoutError:
-            self.safe_output_text_insert(f"Timeout while waiting for chat render: {clip_title}\n")
-        except Exception as e:
-            self.safe_output_text_insert(f"Error in wait_and_combine for {clip_title}: {str(e)}\n")
+            result = subprocess.run(command, check=True, capture_output=True, text=True)
+            stream = json.loads(result.stdout)["streams"][0]
+            return int(stream["width"]), int(stream["height"])
+        except (OSError, subprocess.CalledProcessError, ValueError, KeyError, IndexError) as e:
+            logging.warning(f"Could not probe {video_file}, assuming 1920x1080: {e}")
+            return DEFAULT_VIDEO_SIZE
+
+    def overlay_geometry(self, video_size):
+        # Chat position and size in pixels for a video of video_size. The chat
+        # settings are fractions of the frame, so the overlay lands in the same
+        # place at any resolution.
+        video_width, video_height = video_size
+        x = int(self.chat_settings["chat_x"] * video_width)
+        y = int(self.chat_settings["chat_y"] * video_height)
+        width = max(1, min(int(self.chat_settings["chat_width"] * video_width), video_width - x))
+        height = max(1, min(int(self.chat_settings["chat_height"] * video_height), video_height - y))
+        return x, y, width, height
+
+    def chat_overlay_filter(self, swear_timestamps, video_size):
+        # Puts the rendered chat (input 1) onto the video (input 0) as [vout]
+        # and mutes the swear words into [aout]. The chat is rendered at its
+        # final size, so it is overlaid without scaling.
+        x, y, _, _ = self.overlay_geometry(video_size)
+        overlay_filter = f"[0:v][1:v]overlay={x}:{y}[vout]"
+        if not swear_timestamps:
+            return overlay_filter
+        return f"{overlay_filter};{self.generate_mute_filter(swear_timestamps)}"
+
+    def audio_output_args(self, swear_timestamps):
+        # Audio with nothing to mute is copied rather than re-encoded
+        if not swear_timestamps:
+            return ["-map", "0:a", "-c:a", "copy"]
+        return ["-map", "[aout]"]
+
+    def stream_chat_overlay(self, video_file, chat_output, temp_dir, title, video_size):
+        # Renders the chat into a copy of the video with the audio untouched,
+        # so it doesn't have to wait for the transcript. Returns the copy, or
+        # None when the chat has nothing to overlay.
+        if chat_output is None:
+            return None
+        overlaid_file = os.path.join(temp_dir, "chat_overlaid.mp4")
+        if not self.stream_render_and_combine(video_file, chat_output, overlaid_file, [], temp_dir, title, video_size):
+            raise RuntimeError(f"Rendering chat into {title} failed")
+        return overlaid_file
+
+    def finish_chat_overlay(self, video_file, overlaid_file, combined_output, swear_timestamps, title):
+        # Mutes the swear words in the overlaid copy, copying its video, or
+        # just moves it into place when there are none
+        if overlaid_file is None:
+            self.combine_without_chat(video_file, combined_output, swear_timestamps, title)
+        elif swear_timestamps:
+            self.combine_without_chat(overlaid_file, combined_output, swear_timestamps, title)
+        else:
+            os.replace(overlaid_file, combined_output)
+
+    def stream_render_and_combine(self, video_file, chat_output, combined_output, swear_timestamps, temp_dir, title, video_size):
+        # Renders the chat and combines it in one pass. The renderer writes raw
+        # ARGB frames into a named pipe, and they are relayed from there into
+        # the combining ffmpeg's stdin, so the render never touches the disk.
+        pipe = ChatPipe(temp_dir)
+        render_command = self.chat_render_command(chat_output, pipe.path, "-c:v rawvideo -pix_fmt argb -f nut -y \"{save_path}\"", video_size)
+        combine_command = [
+            "ffmpeg", "-y",
+            "-i", video_file,
+            "-thread_queue_size", "64",
+            "-f", "nut", "-i", "pipe:0",
+            *self.filter_complex_args(self.chat_overlay_filter(swear_timestamps, video_size), temp_dir),
+            "-map", "[vout]",
+            *self.audio_output_args(swear_timestamps),
+            "-threads", str(self.encode_threads()),
+            combined_output
+        ]
 
-    def combine_clip_and_chat(self, clip_output, render_output, combined_output, clip_title, swear_timestamps):
-        x = int(self.chat_settings["chat_x"] * 1920)
-        y = int(self.chat_settings["chat_y"] * 1080)
-        
-        mute_filter = self.generate_mute_filter(swear_timestamps)
-        
+        with self.log_lock:
+            self.safe_output_text_insert(f"Rendering chat into video: {title}\n")
+        try:
+            combine = subprocess.Popen(combine_command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError:
+            pipe.close()
+            raise
+
+        def relay():
+            # Stops when the render ends, or when the combine stops reading
+            # because the video is over
+            try:
+                pipe.connect()
+                for data in iter(pipe.read, b""):
+                    combine.stdin.write(data)
+            except OSError:
+                pass
+            finally:
+                try:
+                    combine.stdin.close()
+                except OSError:
+                    pass
+
+        relay_thread = threading.Thread(target=relay, daemon=True)
+        relay_thread.start()
+        try:
+            render = subprocess.Popen(render_command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        except OSError:
+            pipe.release()
+            relay_thread.join()
+            combine.kill()
+            combine.wait()
+            pipe.close()
+            raise
+        render_errors = []
+
+        def watch_render():
+            # A failed render stops the combine rather than leave it with a
+            # truncated chat. A render that never opened the pipe would leave
+            # the relay waiting for it, so release it.
+            render_errors.extend(render.stderr.readlines())
+            if render.wait() != 0 and combine.poll() is None:
+                combine.kill()
+            pipe.release()
+
+        watcher = threading.Thread(target=watch_render, daemon=True)
+        watcher.start()
+
+        for output in combine.stderr:
+            with self.log_lock:
+                self.safe_output_text_insert(f"FFmpeg [{title}]: {output.decode(errors='replace').strip()}\n")
+        rc = combine.wait()
+
+        # The overlay ends with the video, so whatever chat is left is no
+        # longer needed
+        if render.poll() is None:
+            render.kill()
+        watcher.join()
+        relay_thread.join()
+        pipe.close()
+
+        with self.log_lock:
+            if rc == 0:
+                self.safe_output_text_insert(f"Successfully combined Clip and Chat: {title}\n")
+            else:
+                if render.returncode > 0:
+                    self.safe_output_text_insert(f"Error rendering chat: {title}. {''.join(render_errors[-5:])}\n")
+                self.safe_output_text_insert(f"Error combining Clip and Chat: {title}. Return code: {rc}\n")
+        return rc == 0
+
+    def chat_has_comments(self, chat_file):
+        # Looks for the start of the "comments" array instead of parsing the
+        # whole file, since chats with embedded images run to hundreds of MB.
+        # When in doubt the chat is treated as having comments.
+        pattern = re.compile(rb'(?<!\\)"comments"\s*:\s*\[\s*(\S)')
+        tail = b""
+        try:
+            with open(chat_file, "rb") as f:
+                while True:
+                    chunk = f.read(64 * 1024)
+                    if not chunk:
+                        return True
+                    buffer = tail + chunk
+                    match = pattern.search(buffer)
+                    if match:
+                        return match.group(1) != b"]"
+                    tail = buffer[-256:]
+        except OSError:
+            return True
+
+    def combine_without_chat(self, video_file, combined_output, swear_timestamps, title):
+        # Nothing to overlay: without mutes the video is only remuxed, with
+        # mutes the video stream is copied and just the audio is re-encoded
+        if swear_timestamps:
+            command = [
+                "ffmpeg", "-y",
+                "-i", video_file,
+                *self.filter_complex_args(self.generate_mute_filter(swear_timestamps), os.path.dirname(video_file)),
+                "-map", "0:v",
+                "-map", "[aout]",
+                "-c:v", "copy",
+                combined_output
+            ]
+            self.run_command(command, f"No chat messages, muting audio only: {title}")
+        else:
+            command = [
+                "ffmpeg", "-y",
+                "-i", video_file,
+                "-map", "0",
+                "-c", "copy",
+                combined_output
+            ]
+            self.run_command(command, f"No chat messages or swear words, copying video: {title}")
+
+    def combine_clip_and_chat(self, clip_output, render_output, combined_output, clip_title, swear_timestamps, video_size):
+        filter_option, filter_value = self.filter_complex_args(
+            self.chat_overlay_filter(swear_timestamps, video_size), os.path.dirname(clip_output))
         combine_command = (
-            f"ffmpeg.exe -i \"{clip_output}\" -i \"{render_output}\" "
-            f"-filter_complex \"[1:v]scale={int(self.chat_settings['chat_width'] * 1920)}:{int(self.chat_settings['chat_height'] * 1080)}[v1];"
-            f"[0:v][v1]overlay={x}:{y}[vout];"
-            f"{mute_filter}\" "
-            f"-map \"[vout]\" -map \"[aout]\" \"{combined_output}\""
+            f"ffmpeg.exe -i \"{clip_output}\" {' '.join(overlay_input_args(render_output))} -i \"{render_output}\" "
+            f"{filter_option} \"{filter_value}\" "
+            f"-map \"[vout]\" {' '.join(self.audio_output_args(swear_timestamps))} -threads {self.encode_threads()} \"{combined_output}\""
         )
-        with self.render_lock:
+        # Several combines run at once, one per encode slot; only the log
+        # lines are serialized, and each is tagged with its clip
+        with self.log_lock:
             self.safe_output_text_insert(f"Starting to combine Clip and Chat: {clip_title}\n")
-            process = subprocess.Popen(combine_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            
-            while True:
-                output = process.stderr.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    self.safe_output_text_insert(f"FFmpeg: {output.strip()}\n")
-            
-            rc = process.poll()
+        process = subprocess.Popen(combine_command, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+        while True:
+            output = process.stderr.readline()
+            if output == '' and process.poll() is not None:
+                break
+            if output:
+                with self.log_lock:
+                    self.safe_output_text_insert(f"FFmpeg [{clip_title}]: {output.strip()}\n")
+
+        rc = process.poll()
+        with self.log_lock:
             if rc == 0:
                 self.safe_output_text_insert(f"Successfully combined Clip and Chat: {clip_title}\n")
             else:
@@ -460,17 +992,27 @@ class TwitchDownloader:
     def generate_mute_filter(self, timestamps):
         if not timestamps:
             return "[0:a]acopy[aout]"
-        
-        filter_parts = []
-        for _, start, end in timestamps:
-            start_sec = start / 1000
-            end_sec = end / 1000
-            filter_parts.append(f"volume=enable='between(t,{start_sec},{end_sec})':volume=0")
-        
-        return f"[0:a]{','.join(filter_parts)}[aout]"
+
+        # However many words there are, this is a single volume filter: the
+        # words are merged into padded, non-overlapping intervals and muted
+        # by one enable expression
+        intervals = merge_intervals([(start, end) for _, start, end in timestamps], self.mute_padding_ms)
+        enable = "+".join(f"between(t,{start / 1000:.3f},{end / 1000:.3f})" for start, end in intervals)
+        return f"[0:a]volume=enable='{enable}':volume=0[aout]"
+
+    def filter_complex_args(self, filter_graph, work_dir):
+        # Very long graphs, e.g. a segment with thousands of muted words, are
+        # written to a script file to stay clear of command line limits
+        if len(filter_graph) <= MAX_INLINE_FILTER_LENGTH:
+            return ["-filter_complex", filter_graph]
+        script_path = os.path.join(work_dir, "filter_complex.txt")
+        with open(script_path, "w") as f:
+            f.write(filter_graph)
+        return ["-filter_complex_script", script_path]
 
     def shutdown(self):
-        self.render_pool.shutdown(wait=True)
+        self.transcription_service.shutdown()
+        self.scheduler.shutdown(wait=True)
 
 
     # def render_with_chat(self):
@@ -537,21 +1079,24 @@ class TwitchDownloader:
 
 
     def safe_progress_bar_start(self):
-        if self.progress_bar:
-            self.progress_bar.start()
+        progress_bar = self.current_output().progress_bar
+        if progress_bar:
+            progress_bar.start()
         else:
             print("Warning: Progress bar not initialized")
 
     def safe_progress_bar_stop(self):
-        if self.progress_bar:
-            self.progress_bar.stop()
+        progress_bar = self.current_output().progress_bar
+        if progress_bar:
+            progress_bar.stop()
         else:
             print("Warning: Progress bar not initialized")
 
     def safe_output_text_insert(self, message):
-        if self.output_text:
-            self.output_text.insert(tk.END, message)
-            self.output_text.see(tk.END)
+        output_text = self.current_output().output_text
+        if output_text:
+            output_text.insert(tk.END, message)
+            output_text.see(tk.END)
         else:
             print(f"Output: {message}")
 
@@ -571,25 +1116,26 @@ class TwitchDownloader:
 
 
     def run_command_shelled(self, command, description):
-        if self.progress_bar:
-            self.progress_bar.start()
-        if self.output_text:
-            self.output_text.insert(tk.END, f"{description}\n")
-            self.output_text.see(tk.END)
+        output = self.current_output()
+        if output.progress_bar:
+            output.progress_bar.start()
+        if output.output_text:
+            output.output_text.insert(tk.END, f"{description}\n")
+            output.output_text.see(tk.END)
         try:
             result = subprocess.run(command, check=True, capture_output=True, text=True)
             if result.returncode == 0:
-                if self.output_text:
-                    self.output_text.insert(tk.END, "Completed Successfully\n")
+                if output.output_text:
+                    output.output_text.insert(tk.END, "Completed Successfully\n")
             else:
-                if self.output_text:
-                    self.output_text.insert(tk.END, f"Error: {result.stderr}\n")
+                if output.output_text:
+                    output.output_text.insert(tk.END, f"Error: {result.stderr}\n")
         except Exception as e:
-            if self.output_text:
-                self.output_text.insert(tk.END, f"Exception: {str(e)}\n")
+            if output.output_text:
+                output.output_text.insert(tk.END, f"Exception: {str(e)}\n")
         finally:
-            if self.progress_bar:
-                self.progress_bar.stop()
-            if self.output_text:
-                self.output_text.insert(tk.END, "\n")
-                self.output_text.see(tk.END)
+            if output.progress_bar:
+                output.progress_bar.stop()
+            if output.output_text:
+                output.output_text.insert(tk.END, "\n")
+                output.output_text.see(tk.END)
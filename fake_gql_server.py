@@ -0,0 +1,167 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for gql.twitch.tv that answers clip queries with synthetic
+# clips and can be told to throttle or fail, to exercise the retry and rate
+# limiting in twitchtools. Point the app at it with
+#   TWITCH_GQL_URL=http://127.0.0.1:8787/gql
+# Cursors are plain offsets and every login has clips_per_user clips with
+# view counts descending, as Twitch returns them.
+
+CLIPS_QUERY = re.compile(r'user\(login: "((?:[^"\\]|\\.)*)"\).*?clips\(first: (\d+), after: "(\d*)"', re.S)
+CLIP_QUERY = re.compile(r'clip\(slug: "((?:[^"\\]|\\.)*)"\)')
+
+
+class FakeGQLServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, clips_per_user=500, rate_limit=None, throttle_every=0,
+                 error_rate=0.0, gql_error_rate=0.0, retry_after=1, latency=0.0):
+        super().__init__(address, FakeGQLHandler)
+        self.clips_per_user = clips_per_user
+        self.rate_limit = rate_limit  # Requests per second before answering 429
+        self.throttle_every = throttle_every  # Answer every Nth request with 429
+        self.error_rate = error_rate  # Share of requests answered with 503
+        # Share of requests answered with HTTP 200 but only GQL errors, as
+        # Twitch does for some timeouts and throttling
+        self.gql_error_rate = gql_error_rate
+        self.retry_after = retry_after
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.stats = {"ok": 0, "throttled": 0, "errors": 0, "gql_errors": 0, "operations": 0}
+
+    def should_throttle(self):
+        with self.lock:
+            self.request_count += 1
+            if self.throttle_every and self.request_count % self.throttle_every == 0:
+                return True
+            if self.rate_limit:
+                now = time.monotonic()
+                if now - self.window_start >= 1:
+                    self.window_start, self.window_count = now, 0
+                self.window_count += 1
+                return self.window_count > self.rate_limit
+            return False
+
+    def count(self, stat, amount=1):
+        with self.lock:
+            self.stats[stat] += amount
+
+    def clip(self, login, index):
+        return {
+            "id": f"{login}-{index}",
+            "slug": f"{login}Clip{index}",
+            "title": f"{login} clip {index}",
+            "createdAt": "2024-01-01T00:00:00Z",
+            "durationSeconds": 30,
+            "thumbnailURL": f"https://example.invalid/{login}/{index}.jpg",
+            "viewCount": (self.clips_per_user - index) * 10,
+            "game": {"id": "1", "displayName": "Just Chatting"},
+        }
+
+    def answer(self, operation):
+        query = operation.get("query", "")
+        match = CLIPS_QUERY.search(query)
+        if match:
+            login, first, after = json.loads(f'"{match.group(1)}"'), int(match.group(2)), int(match.group(3) or 0)
+            end = min(self.clips_per_user, after + first)
+            edges = [{"cursor": str(i + 1), "node": self.clip(login, i)} for i in range(after, end)]
+            return {"data": {"user": {"clips": {
+                "edges": edges,
+                "pageInfo": {"hasNextPage": end < self.clips_per_user, "hasPreviousPage": after > 0},
+            }}}}
+        match = CLIP_QUERY.search(query)
+        if match:
+            slug = json.loads(f'"{match.group(1)}"')
+            return {"data": {"clip": dict(self.clip("fake", 0), slug=slug)}}
+        return {"errors": [{"message": "unsupported query"}], "data": None}
+
+
+class FakeGQLHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        if server.should_throttle():
+            server.count("throttled")
+            self.send_json(429, {"error": "Too Many Requests"}, {"Retry-After": str(server.retry_after)})
+            return
+        if random.random() < server.error_rate:
+            server.count("errors")
+            self.send_json(503, {"error": "Service Unavailable"})
+            return
+
+        operations = body if isinstance(body, list) else [body]
+        if random.random() < server.gql_error_rate:
+            server.count("gql_errors")
+            answers = [{"errors": [{"message": "service timeout"}], "data": None} for _ in operations]
+            self.send_json(200, answers if isinstance(body, list) else answers[0])
+            return
+        server.count("ok")
+        server.count("operations", len(operations))
+        answers = [server.answer(operation) for operation in operations]
+        self.send_json(200, answers if isinstance(body, list) else answers[0])
+
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_server(host="127.0.0.1", port=0, **options):
+    # Starts the server on a background thread and returns it; its URL is
+    # http://host:server.server_port/gql
+    server = FakeGQLServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Twitch GQL API")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--clips-per-user", type=int, default=500)
+    parser.add_argument("--rate-limit", type=float, help="requests per second before answering 429")
+    parser.add_argument("--throttle-every", type=int, default=0, help="answer every Nth request with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--gql-error-rate", type=float, default=0.0,
+                        help="share of requests answered with HTTP 200 and only GQL errors")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    args = parser.parse_args()
+
+    server = FakeGQLServer(
+        ("127.0.0.1", args.port), clips_per_user=args.clips_per_user, rate_limit=args.rate_limit,
+        throttle_every=args.throttle_every, error_rate=args.error_rate,
+        gql_error_rate=args.gql_error_rate, retry_after=args.retry_after,
+        latency=args.latency
+    )
+    print(f"Fake Twitch GQL listening on http://127.0.0.1:{args.port}/gql")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Served: {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the AssemblyAI upload and transcript endpoints, to
+# exercise the transcription service without an API key. Point the app at it
+# with
+#   ASSEMBLY_BASE_URL=http://127.0.0.1:8788 ASSEMBLY_API_KEY=fake
+# A transcript completes processing_time seconds after it is created. Its
+# words are made up, one every 400 ms over the audio's length, which is
+# estimated from the upload size at bytes_per_second (24 kbps Opus by default).
+
+TRANSCRIPT_PATH = re.compile(r"^/v2/transcript/([\w-]+)$")
+WORDS = "so yeah that was a really good round chat let's go again okay what nice shot".split()
+SWEARS = ["fuck", "shit", "damn"]
+
+
+class FakeTranscriptionServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, processing_time=2.0, bytes_per_second=3000, swear_rate=0.02,
+                 error_rate=0.0, seed=0):
+        super().__init__(address, FakeTranscriptionHandler)
+        self.processing_time = processing_time
+        self.bytes_per_second = bytes_per_second
+        self.swear_rate = swear_rate
+        self.error_rate = error_rate  # Share of transcripts that end in status "error"
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.uploads = {}  # Upload URL -> size in bytes
+        self.transcripts = {}
+        self.stats = {"uploads": 0, "upload_bytes": 0, "created": 0, "polls": 0, "max_processing": 0}
+
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_port}"
+
+    def add_upload(self, size):
+        with self.lock:
+            upload_url = f"{self.url()}/v2/uploads/{next(self.ids)}"
+            self.uploads[upload_url] = size
+            self.stats["uploads"] += 1
+            self.stats["upload_bytes"] += size
+        return upload_url
+
+    def create_transcript(self, request):
+        with self.lock:
+            transcript_id = f"fake-{next(self.ids)}"
+            size = self.uploads.get(request.get("audio_url"), 0)
+            self.transcripts[transcript_id] = {
+                "request": request,
+                "created": time.monotonic(),
+                "duration": size / self.bytes_per_second,
+                "failed": random.random() < self.error_rate,
+            }
+            self.stats["created"] += 1
+            processing = sum(1 for t in self.transcripts.values()
+                             if time.monotonic() - t["created"] < self.processing_time)
+            self.stats["max_processing"] = max(self.stats["max_processing"], processing)
+        return self.transcript(transcript_id)
+
+    def transcript(self, transcript_id):
+        with self.lock:
+            entry = self.transcripts.get(transcript_id)
+        if entry is None:
+            return None
+        response = {"id": transcript_id, "audio_url": entry["request"].get("audio_url"), "status": "queued"}
+        age = time.monotonic() - entry["created"]
+        if age < self.processing_time:
+            if age > self.processing_time / 2:
+                response["status"] = "processing"
+            return response
+        if entry["failed"]:
+            response.update(status="error", error="fake transcription failure")
+            return response
+
+        rng = random.Random(f"{self.seed}-{entry['request'].get('audio_url')}")
+        words = []
+        for start in range(0, int(entry["duration"] * 1000) - 300, 400):
+            text = rng.choice(SWEARS) if rng.random() < self.swear_rate else rng.choice(WORDS)
+            words.append({"text": text, "start": start, "end": start + 300, "confidence": 0.9})
+        response.update(
+            status="completed",
+            text=" ".join(word["text"] for word in words),
+            words=words,
+            audio_duration=entry["duration"],
+        )
+        return response
+
+
+class FakeTranscriptionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return body
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        body = self.read_body()
+        if self.path == "/v2/upload":
+            self.send_json(200, {"upload_url": self.server.add_upload(len(body))})
+        elif self.path == "/v2/transcript":
+            self.send_json(200, self.server.create_transcript(json.loads(body or b"{}")))
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def do_GET(self):
+        match = TRANSCRIPT_PATH.match(self.path)
+        transcript = self.server.transcript(match.group(1)) if match else None
+        if transcript is None:
+            self.send_json(404, {"error": "Transcript not found"})
+            return
+        with self.server.lock:
+            self.server.stats["polls"] += 1
+        self.send_json(200, transcript)
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_server(host="127.0.0.1", port=0, **options):
+    # Starts the server on a background thread and returns it; set
+    # aai.settings.base_url to server.url()
+    server = FakeTranscriptionServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the AssemblyAI transcription API")
+    parser.add_argument("--port", type=int, default=8788)
+    parser.add_argument("--processing-time", type=float, default=2.0, help="seconds until a transcript completes")
+    parser.add_argument("--bytes-per-second", type=int, default=3000, help="upload bytes per second of audio")
+    parser.add_argument("--swear-rate", type=float, default=0.02, help="share of made-up words that are swears")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of transcripts that fail")
+    args = parser.parse_args()
+
+    server = FakeTranscriptionServer(
+        ("127.0.0.1", args.port), processing_time=args.processing_time,
+        bytes_per_second=args.bytes_per_second, swear_rate=args.swear_rate, error_rate=args.error_rate
+    )
+    print(f"Fake AssemblyAI listening on {server.url()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Served: {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,17 +6,205 @@ import bs4
 from tkinter import filedialog
 from bs4 import BeautifulSoup
 import threading
+import concurrent.futures
+from collections import OrderedDict
 import twitchtools
 from PIL import Image, ImageTk, ImageDraw
-from io import BytesIO
 from datetime import datetime
 from tkinter import messagebox
-from downloader import TwitchDownloader
+from downloader import TwitchDownloader, JobOutput
+from thumbcache import THUMBNAIL_SIZE, get_thumbnail_cache
+from overlaycodecs import OVERLAY_CODECS, DEFAULT_OVERLAY_CODEC
+
+
+class ClipPrefetcher:
+    # Loads the page after the one on screen, and its thumbnails, in the
+    # background so paging forward doesn't wait on the network. Prefetched
+    # thumbnails are held up to memory_budget bytes, oldest dropped first.
+    def __init__(self, thumbnail_cache, max_workers=4, memory_budget=16 * 1024 * 1024):
+        self.thumbnail_cache = thumbnail_cache
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.memory_budget = memory_budget
+        self.memory_used = 0
+        self.thumbnails = OrderedDict()
+        self.futures = []
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.key = None
+
+    def reset(self, key):
+        # Drops all prefetched work unless it was for the same (username, period)
+        if key != self.key:
+            self.cancel()
+            self.key = key
+
+    def cancel(self):
+        with self.lock:
+            self.generation += 1
+            self.key = None
+            for future in self.futures:
+                future.cancel()
+            self.futures = []
+            self.thumbnails.clear()
+            self.memory_used = 0
+
+    def prefetch(self, clip_fetcher, page, limit=30):
+        with self.lock:
+            self.futures = [f for f in self.futures if not f.done()]
+            self.futures.append(self.executor.submit(self.prefetch_page, self.generation, clip_fetcher, page, limit))
+
+    def prefetch_page(self, generation, clip_fetcher, page, limit):
+        if generation != self.generation:
+            return
+        # Fills the fetcher's page index, so the page itself loads instantly
+        try:
+            clips = twitchtools.fetch_clips(clip_fetcher, limit=limit, page=page)
+        except twitchtools.TwitchAPIError as e:
+            print(f"Error prefetching clips: {e}")
+            return
+        with self.lock:
+            if generation != self.generation:
+                return
+            for clip in clips:
+                self.futures.append(self.executor.submit(self.prefetch_thumbnail, generation, clip['thumbnailURL']))
+
+    def prefetch_thumbnail(self, generation, url):
+        if generation != self.generation or url in self.thumbnails:
+            return
+        try:
+            img = self.thumbnail_cache.load_image(url)
+        except (requests.RequestException, OSError) as e:
+            print(f"Error prefetching thumbnail: {e}")
+            return
+
+        size = img.width * img.height * len(img.getbands())
+        with self.lock:
+            if generation != self.generation or size > self.memory_budget:
+                return
+            while self.memory_used + size > self.memory_budget:
+                _, (_, old_size) = self.thumbnails.popitem(last=False)
+                self.memory_used -= old_size
+            self.thumbnails[url] = (img, size)
+            self.memory_used += size
+
+    def take_thumbnail(self, url):
+        with self.lock:
+            entry = self.thumbnails.pop(url, None)
+            if entry is None:
+                return None
+            img, size = entry
+            self.memory_used -= size
+            return img
+
+
+TILE_WIDTH = 260
+TILE_HEIGHT = 280
+TILE_PADDING = 10
+
+
+class ClipTile:
+    # The widgets showing one clip. In the virtualized grid a tile is rebound
+    # to whichever clip scrolls into its slot instead of being destroyed.
+    def __init__(self, clip_frame, parent):
+        self.clip_frame = clip_frame
+        self.clip = None
+        self.frame = ttk.Frame(parent, width=TILE_WIDTH, height=TILE_HEIGHT, style="TFrame")
+        self.frame.grid_propagate(False)
+        self.frame.pack_propagate(False)
+
+        self.thumbnail_label = ttk.Label(self.frame, image=clip_frame.placeholder, style="Clip.TLabel")
+        self.thumbnail_label.image = clip_frame.placeholder  # Keep a reference
+        self.thumbnail_label.url = None
+        self.thumbnail_label.pack(pady=(10, 5))
+
+        self.title_label = ttk.Label(self.frame, wraplength=240, justify="center", style="Clip.TLabel")
+        self.title_label.pack(fill="x", expand=True)
+        self.date_label = ttk.Label(self.frame, wraplength=240, justify="center", style="Clip.TLabel")
+        self.date_label.pack(fill="x")
+        self.views_label = ttk.Label(self.frame, wraplength=240, justify="center", style="Clip.TLabel")
+        self.views_label.pack(fill="x")
+
+        # Bind click event to the frame and all its labels
+        self.frame.bind("<Button-1>", self.on_click)
+        for child in self.frame.winfo_children():
+            child.bind("<Button-1>", self.on_click)
+
+    def on_click(self, event):
+        if self.clip is not None:
+            self.clip_frame.toggle_clip_selection(self.clip, self.frame)
+
+    def show(self, clip):
+        self.clip = clip
+        self.clip_frame.set_thumbnail(self.thumbnail_label, clip['thumbnailURL'])
+        self.title_label.configure(text=clip['title'])
+
+        created_at = datetime.fromisoformat(clip['createdAt'].rstrip('Z'))
+        date_str = created_at.strftime("%Y-%m-%d %H:%M")
+        self.date_label.configure(text=f"Created: {date_str}")
+        self.views_label.configure(text=f"Views: {clip['viewCount']:,}")
+
+        # Set style based on whether the clip is in selected_clips
+        self.clip_frame.apply_selection_style(self.frame, clip['id'] in self.clip_frame.selected_clips)
+
+
+class ClipPageLoader:
+    # Fetches a page of clips on a background thread and streams it into a
+    # ScrollableClipFrame in small batches from after() callbacks, so the
+    # window keeps responding during network I/O. Starting a new load, or
+    # cancel(), makes any earlier load drop its results when they arrive.
+    def __init__(self, clip_frame, batch_size=6, batch_delay=10):
+        self.clip_frame = clip_frame
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.generation = 0
+        self.loading = False
+
+    def load(self, fetch, on_done):
+        self.generation += 1
+        self.loading = True
+        self.clip_frame.clear_clips()
+        thread = threading.Thread(target=self.run_fetch, args=(self.generation, fetch, on_done), daemon=True)
+        thread.start()
+
+    def cancel(self):
+        # Returns True if a load was dropped, in which case its on_done
+        # will never be called
+        self.generation += 1
+        was_loading = self.loading
+        self.loading = False
+        return was_loading
+
+    def run_fetch(self, generation, fetch, on_done):
+        try:
+            clips, error = fetch(), None
+        except Exception as e:
+            clips, error = [], e
+        if generation != self.generation:
+            return
+        self.clip_frame.after(0, self.insert_batch, generation, clips, 0, on_done, error)
+
+    def insert_batch(self, generation, clips, start, on_done, error):
+        if generation != self.generation:
+            return
+        end = start + self.batch_size
+        self.clip_frame.add_clips(clips[start:end])
+        if end < len(clips):
+            self.clip_frame.after(self.batch_delay, self.insert_batch, generation, clips, end, on_done, error)
+        else:
+            self.loading = False
+            on_done(clips, error)
 
 
 class ScrollableClipFrame(ttk.Frame):
-    def __init__(self, parent, *args, **kwargs):
+    # Grid of clip tiles. With virtual=True only the rows in view (plus
+    # overscan rows either side) have widgets, and those are reused while
+    # scrolling, so any number of clips can be shown at a flat cost.
+    def __init__(self, parent, *args, thumbnail_cache=None, prefetcher=None, virtual=False, overscan=1, **kwargs):
         ttk.Frame.__init__(self, parent, *args, **kwargs)
+        self.thumbnail_cache = thumbnail_cache or get_thumbnail_cache()
+        self.prefetcher = prefetcher
+        self.virtual = virtual
+        self.overscan = overscan
         self.selected_clips = {}  # Changed to a dictionary to store clip data
         self.style = ttk.Style()
         self.style.configure("TFrame", background="white")
@@ -27,15 +215,19 @@ class ScrollableClipFrame(ttk.Frame):
         # Create canvas
         self.canvas = tk.Canvas(self)
         self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = ttk.Frame(self.canvas)
 
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
-
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        if self.virtual:
+            # Tiles are canvas windows positioned by refresh_visible()
+            self.scrollable_frame = None
+            self.canvas.configure(yscrollcommand=self.on_scroll)
+        else:
+            self.scrollable_frame = ttk.Frame(self.canvas)
+            self.scrollable_frame.bind(
+                "<Configure>",
+                lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+            )
+            self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
+            self.canvas.configure(yscrollcommand=self.scrollbar.set)
 
         self.canvas.pack(side="left", fill="both", expand=True)
         self.scrollbar.pack(side="right", fill="y")
@@ -48,10 +240,28 @@ class ScrollableClipFrame(ttk.Frame):
         self.current_column = 0
         self.max_columns = 3  # Adjust this value to change the number of columns
 
+        # Virtual mode state: all clips, the tile showing each visible clip
+        # index, and tiles currently not in use
+        self.clips = []
+        self.visible_tiles = {}
+        self.free_tiles = []
+        self.refresh_pending = False
+        self.scrollregion = None
+
+        # Thumbnails are downloaded and resized on a worker pool; tiles show a
+        # placeholder until theirs arrives. load_generation is bumped whenever
+        # the tiles are cleared so late thumbnails for old tiles are dropped.
+        self.thumbnail_pool = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+        self.placeholder = ImageTk.PhotoImage(Image.new("RGB", THUMBNAIL_SIZE, "#d9d9d9"))
+        self.load_generation = 0
+
         # Bind the configure event to center the content
         self.canvas.bind("<Configure>", self.center_content)
 
     def center_content(self, event):
+        if self.virtual:
+            self.layout()
+            return
         canvas_width = event.width
         frame_width = self.scrollable_frame.winfo_reqwidth()
         if frame_width < canvas_width:
@@ -62,45 +272,14 @@ class ScrollableClipFrame(ttk.Frame):
         self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
 
     def add_clip(self, clip):
-        frame = ttk.Frame(self.scrollable_frame, width=260, height=280, style="TFrame")
-        frame.grid(row=self.current_row, column=self.current_column, padx=10, pady=10, sticky="nsew")
-        frame.grid_propagate(False)
-
-        # Load and display thumbnail
-        response = requests.get(clip['thumbnailURL'])
-        img = Image.open(BytesIO(response.content))
-        img = img.resize((240, 135), Image.LANCZOS)  # Slightly larger thumbnail
-        photo = ImageTk.PhotoImage(img)
-        thumbnail_label = ttk.Label(frame, image=photo, style="Clip.TLabel")
-        thumbnail_label.image = photo  # Keep a reference
-        thumbnail_label.pack(pady=(10, 5))
-
-        # Display title
-        title_label = ttk.Label(frame, text=clip['title'], wraplength=240, justify="center", style="Clip.TLabel")
-        title_label.pack(fill="x", expand=True)
-
-        # Display date
-        created_at = datetime.fromisoformat(clip['createdAt'].rstrip('Z'))
-        date_str = created_at.strftime("%Y-%m-%d %H:%M")
-        date_label = ttk.Label(frame, text=f"Created: {date_str}", wraplength=240, justify="center", style="Clip.TLabel")
-        date_label.pack(fill="x")
-
-        # Display views
-        views_label = ttk.Label(frame, text=f"Views: {clip['viewCount']:,}", wraplength=240, justify="center", style="Clip.TLabel")
-        views_label.pack(fill="x")
-
-        # Set initial style based on whether the clip is in selected_clips
-        initial_style = "Selected.TFrame" if clip['id'] in self.selected_clips else "TFrame"
-        frame.configure(style=initial_style)
-
-        # Bind click event to the frame
-        frame.bind("<Button-1>", lambda event, c=clip, f=frame: self.toggle_clip_selection(c, f))
-        
-        # Make sure all child widgets also trigger the selection
-        for child in frame.winfo_children():
-            child.bind("<Button-1>", lambda event, c=clip, f=frame: self.toggle_clip_selection(c, f))
+        if self.virtual:
+            self.add_clips([clip])
+            return
 
-        self.clip_frames.append((frame, clip['id']))
+        tile = ClipTile(self, self.scrollable_frame)
+        tile.frame.grid(row=self.current_row, column=self.current_column, padx=TILE_PADDING, pady=TILE_PADDING, sticky="nsew")
+        tile.show(clip)
+        self.clip_frames.append((tile.frame, clip['id']))
 
         # Update grid position
         self.current_column += 1
@@ -108,19 +287,124 @@ class ScrollableClipFrame(ttk.Frame):
             self.current_column = 0
             self.current_row += 1
 
+    def add_clips(self, clips):
+        if not self.virtual:
+            for clip in clips:
+                self.add_clip(clip)
+            return
+
+        self.clips.extend(clips)
+        # Lay out once for a whole burst of additions
+        if not self.refresh_pending:
+            self.refresh_pending = True
+            self.after_idle(self.layout)
+
+    def on_scroll(self, first, last):
+        # The canvas' yscrollcommand. It must not configure the canvas, as
+        # that schedules another scrollbar update and so another call here.
+        self.scrollbar.set(first, last)
+        self.refresh_visible()
+
+    def layout(self):
+        # Sizes the scroll region for the clip count and canvas width, then
+        # binds tiles. Only called when one of those changes.
+        self.refresh_pending = False
+        row_height = TILE_HEIGHT + 2 * TILE_PADDING
+        rows = (len(self.clips) + self.max_columns - 1) // self.max_columns
+        grid_width = (TILE_WIDTH + 2 * TILE_PADDING) * self.max_columns
+        scrollregion = (0, 0, max(self.canvas.winfo_width(), grid_width), rows * row_height)
+        if scrollregion != self.scrollregion:
+            self.scrollregion = scrollregion
+            self.canvas.configure(scrollregion=scrollregion)
+        self.refresh_visible()
+
+    def refresh_visible(self):
+        # Binds tiles to the clips in the visible rows (plus overscan) and
+        # releases tiles whose clips scrolled out of range
+        row_height = TILE_HEIGHT + 2 * TILE_PADDING
+        col_width = TILE_WIDTH + 2 * TILE_PADDING
+        rows = (len(self.clips) + self.max_columns - 1) // self.max_columns
+        canvas_width = self.canvas.winfo_width()
+        grid_width = col_width * self.max_columns
+
+        top = self.canvas.canvasy(0)
+        bottom = self.canvas.canvasy(self.canvas.winfo_height())
+        first_row = max(0, int(top // row_height) - self.overscan)
+        last_row = min(rows - 1, int(bottom // row_height) + self.overscan)
+        wanted = range(first_row * self.max_columns, min(len(self.clips), (last_row + 1) * self.max_columns))
+
+        for index in [i for i in self.visible_tiles if i not in wanted]:
+            tile, window = self.visible_tiles.pop(index)
+            self.canvas.itemconfigure(window, state="hidden")
+            self.free_tiles.append((tile, window))
+
+        x_offset = max(0, (canvas_width - grid_width) // 2)
+        for index in wanted:
+            row, column = divmod(index, self.max_columns)
+            position = (x_offset + column * col_width + TILE_PADDING, row * row_height + TILE_PADDING)
+            if index in self.visible_tiles:
+                tile, window = self.visible_tiles[index]
+                # Recentre tiles already shown when the canvas width changed
+                if tuple(self.canvas.coords(window)) != position:
+                    self.canvas.coords(window, *position)
+                continue
+            if self.free_tiles:
+                tile, window = self.free_tiles.pop()
+                self.canvas.itemconfigure(window, state="normal")
+            else:
+                tile = ClipTile(self, self.canvas)
+                window = self.canvas.create_window(0, 0, window=tile.frame, anchor="nw")
+            self.canvas.coords(window, *position)
+            tile.show(self.clips[index])
+            self.visible_tiles[index] = (tile, window)
+
+    def set_thumbnail(self, thumbnail_label, url):
+        # Display the thumbnail straight away if it is cached in memory or was
+        # prefetched, otherwise a placeholder until a worker has loaded it
+        thumbnail_label.url = url
+        photo = self.thumbnail_cache.get_photo(url)
+        thumbnail_label.configure(image=photo or self.placeholder)
+        thumbnail_label.image = photo or self.placeholder  # Keep a reference
+        if photo is None:
+            img = self.prefetcher.take_thumbnail(url) if self.prefetcher else None
+            if img is not None:
+                self.show_thumbnail(self.load_generation, thumbnail_label, url, img)
+            else:
+                self.thumbnail_pool.submit(self.fetch_thumbnail, self.load_generation, thumbnail_label, url)
+
+    def fetch_thumbnail(self, generation, thumbnail_label, url):
+        # Runs on the thumbnail pool
+        if generation != self.load_generation or thumbnail_label.url != url:
+            return
+        try:
+            img = self.thumbnail_cache.load_image(url)
+        except (requests.RequestException, OSError) as e:
+            print(f"Error loading thumbnail: {e}")
+            return
+        self.after(0, self.show_thumbnail, generation, thumbnail_label, url, img)
+
+    def show_thumbnail(self, generation, thumbnail_label, url, img):
+        # Runs on the Tk thread, where PhotoImages have to be created. The
+        # label may have been destroyed or, in virtual mode, rebound.
+        photo = self.thumbnail_cache.put_photo(url, img)
+        if generation != self.load_generation or not thumbnail_label.winfo_exists() or thumbnail_label.url != url:
+            return
+        thumbnail_label.configure(image=photo)
+        thumbnail_label.image = photo  # Keep a reference
+
+    def apply_selection_style(self, frame, selected):
+        frame.configure(style="Selected.TFrame" if selected else "TFrame")
+        for child in frame.winfo_children():
+            if isinstance(child, ttk.Label):
+                child.configure(style="Selected.Clip.TLabel" if selected else "Clip.TLabel")
+
     def toggle_clip_selection(self, clip, frame):
         if clip['id'] in self.selected_clips:
             del self.selected_clips[clip['id']]
-            frame.configure(style="TFrame")
-            for child in frame.winfo_children():
-                if isinstance(child, ttk.Label):
-                    child.configure(style="Clip.TLabel")
+            self.apply_selection_style(frame, False)
         else:
             self.selected_clips[clip['id']] = clip
-            frame.configure(style="Selected.TFrame")
-            for child in frame.winfo_children():
-                if isinstance(child, ttk.Label):
-                    child.configure(style="Selected.Clip.TLabel")
+            self.apply_selection_style(frame, True)
 
     def get_selected_clips(self):
         print("Inside get_selected_clips")
@@ -128,25 +412,28 @@ class ScrollableClipFrame(ttk.Frame):
         return list(self.selected_clips.values())
     
     def clear_clips(self):
+        self.load_generation += 1
         for frame, _ in self.clip_frames:
             frame.destroy()
         self.clip_frames = []
         self.current_row = 0
         self.current_column = 0
+
+        self.clips = []
+        for index in list(self.visible_tiles):
+            tile, window = self.visible_tiles.pop(index)
+            self.canvas.itemconfigure(window, state="hidden")
+            self.free_tiles.append((tile, window))
+        if self.virtual:
+            self.canvas.yview_moveto(0)
+            self.layout()
         # Note: We're not clearing selected_clips here anymore
         
     def update_selection_display(self):
         for frame, clip_id in self.clip_frames:
-            if clip_id in self.selected_clips:
-                frame.configure(style="Selected.TFrame")
-                for child in frame.winfo_children():
-                    if isinstance(child, ttk.Label):
-                        child.configure(style="Selected.Clip.TLabel")
-            else:
-                frame.configure(style="TFrame")
-                for child in frame.winfo_children():
-                    if isinstance(child, ttk.Label):
-                        child.configure(style="Clip.TLabel")
+            self.apply_selection_style(frame, clip_id in self.selected_clips)
+        for tile, _ in self.visible_tiles.values():
+            self.apply_selection_style(tile.frame, tile.clip['id'] in self.selected_clips)
 
         
 clip_fetcher = None
@@ -214,13 +501,12 @@ def download_vod_segments(root, twitch_downloader, simultaneous_var):
     close_button.pack(pady=10)
     close_button.config(state="disabled")
 
-    # Set the progress bar and output text for the twitch_downloader
-    twitch_downloader.set_progress_bar(progress_bar)
-    twitch_downloader.set_output_text(progress_text)
+    # This window's segments report here, even while other batches run
+    output = JobOutput(progress_text, progress_bar)
 
     def download_thread():
         try:
-            twitch_downloader.download_vod_segments(vod_url, timestamps, download_dir)
+            twitch_downloader.download_vod_segments(vod_url, timestamps, download_dir, output)
             progress_window.after(0, lambda: progress_text.insert(tk.END, "All VOD segments have been downloaded and processed.\n"))
         except Exception as e:
             error_message = f"An error occurred: {str(e)}\n"
@@ -372,6 +658,23 @@ def open_settings_window(twitch_downloader):
     font_size_spinbox = ttk.Spinbox(font_size_frame, from_=8, to=72, textvariable=font_size_var, width=5)
     font_size_spinbox.pack(side="left", padx=5)
 
+    # Stream the chat render straight into ffmpeg through a named pipe
+    # instead of writing it to disk
+    stream_render_var = tk.BooleanVar(value=chat_settings.get("stream_chat_render", False))
+    ttk.Checkbutton(settings_window, text="Stream chat render (no intermediate file)", variable=stream_render_var).pack(pady=5)
+
+    # Codec of the rendered chat when it isn't streamed
+    codec_frame = ttk.Frame(settings_window)
+    codec_frame.pack(pady=5)
+    ttk.Label(codec_frame, text="Chat Render Codec:").pack(side="left")
+    codec_names = list(OVERLAY_CODECS)
+    codec_labels = [OVERLAY_CODECS[name]["label"] for name in codec_names]
+    current_codec = chat_settings.get("overlay_codec", DEFAULT_OVERLAY_CODEC)
+    if current_codec not in OVERLAY_CODECS:
+        current_codec = DEFAULT_OVERLAY_CODEC
+    codec_var = tk.StringVar(value=OVERLAY_CODECS[current_codec]["label"])
+    ttk.Combobox(codec_frame, textvariable=codec_var, values=codec_labels, state="readonly", width=28).pack(side="left", padx=5)
+
     # Add background color control
     color_frame = ttk.Frame(settings_window)
     color_frame.pack(pady=10)
@@ -495,6 +798,8 @@ def open_settings_window(twitch_downloader):
             "chat_width": width,
             "chat_height": height,
             "font_size": font_size_var.get(),
+            "stream_chat_render": stream_render_var.get(),
+            "overlay_codec": codec_names[codec_labels.index(codec_var.get())],
             "background_color": f"{alpha_var.get():02x}{red_var.get():02x}{green_var.get():02x}{blue_var.get():02x}"
         }
         twitch_downloader.set_chat_settings(settings)
@@ -647,7 +952,8 @@ def open_bulk_download_window(root, twitch_downloader):
 def create_top_clips_tab(parent, twitch_downloader):
     # Move the existing content for fetching top clips here
     ttk.Label(parent, text="Streamer Username:").pack(pady=5)
-    username_entry = ttk.Entry(parent, width=30)
+    username_var = tk.StringVar(parent)
+    username_entry = ttk.Entry(parent, textvariable=username_var, width=30)
     username_entry.pack(pady=5)
 
     ttk.Label(parent, text="Time Period:").pack(pady=5)
@@ -658,12 +964,36 @@ def create_top_clips_tab(parent, twitch_downloader):
     time_menu = ttk.OptionMenu(parent, time_period, *time_options)
     time_menu.pack(pady=5)
 
-    clip_frame = ScrollableClipFrame(parent)
+    # Prefetched pages are only useful for the username and period they were
+    # fetched for, so stop that work as soon as either changes
+    thumbnail_cache = get_thumbnail_cache(**twitch_downloader.thumbnail_cache_settings)
+    prefetcher = ClipPrefetcher(thumbnail_cache)
+
+    clip_frame = ScrollableClipFrame(parent, thumbnail_cache=thumbnail_cache, prefetcher=prefetcher, virtual=True)
     clip_frame.pack(fill="both", expand=True, padx=10, pady=10)
+    page_loader = ClipPageLoader(clip_frame)
+
+    def cancel_loading(*args):
+        prefetcher.cancel()
+        if page_loader.cancel():
+            page_label.config(text=f"Page: {page_var.get()}")
+
+    username_var.trace_add("write", cancel_loading)
+    time_period.trace_add("write", cancel_loading)
 
     page_var = tk.IntVar(value=1)
     page_label = ttk.Label(parent, text="Page: 1")
     page_label.pack()
+
+    cache_stats_label = ttk.Label(parent, text=thumbnail_cache.stats_text())
+    cache_stats_label.pack()
+
+    def update_cache_stats():
+        if cache_stats_label.winfo_exists():
+            cache_stats_label.config(text=thumbnail_cache.stats_text())
+            cache_stats_label.after(1000, update_cache_stats)
+
+    update_cache_stats()
     simultaneous_frame = ttk.Frame(parent)
     simultaneous_frame.pack(pady=5)
 
@@ -707,26 +1037,18 @@ def create_top_clips_tab(parent, twitch_downloader):
         close_button.pack(pady=10)
         close_button.config(state="disabled")
 
-        # Store the original output_text and progress_bar
-        original_output_text = twitch_downloader.output_text
-        original_progress_bar = twitch_downloader.progress_bar
-
-        # Temporarily replace them with the new ones
-        twitch_downloader.output_text = progress_text
-        twitch_downloader.progress_bar = progress_bar
+        # This window's clips report here, even while other batches run
+        output = JobOutput(progress_text, progress_bar)
 
         def download_thread():
             username = username_entry.get()
             try:
-                twitch_downloader.bulk_download_clips(selected_clips, download_dir, username)
+                twitch_downloader.bulk_download_clips(selected_clips, download_dir, username, output)
                 progress_window.after(0, lambda: progress_text.insert(tk.END, "All selected clips have been downloaded and processed.\n"))
             except Exception as e:
                 error_message = f"An error occurred: {str(e)}\n"
                 progress_window.after(0, lambda: progress_text.insert(tk.END, error_message))
             finally:
-                # Restore the original output_text and progress_bar
-                twitch_downloader.output_text = original_output_text
-                twitch_downloader.progress_bar = original_progress_bar
                 progress_window.after(0, lambda: close_button.config(state="normal"))
 
         thread = threading.Thread(target=download_thread)
@@ -739,20 +1061,28 @@ def create_top_clips_tab(parent, twitch_downloader):
         username = username_entry.get()
         period = time_period.get()
         clip_fetcher = twitchtools.get_clip_fetcher(username, period)
+        prefetcher.reset((username, period))
         
-        # Fetch clips for the desired page
-        clips = twitchtools.fetch_clips(clip_fetcher, limit=30, page=page)
-        
-        clip_frame.clear_clips()
-        for clip in clips:
-            clip_frame.add_clip(clip)
-        
-        clip_frame.update_selection_display()  # Update the display to show correct selections
-        
-        page_label.config(text=f"Page: {page}")
+        page_label.config(text=f"Page: {page} (loading...)")
         page_var.set(page)
         page_dropdown.set(page)
 
+        def on_loaded(clips, error):
+            if error is not None:
+                page_label.config(text=f"Page: {page}")
+                messagebox.showerror("Error", f"Could not fetch clips: {error}")
+                return
+
+            clip_frame.update_selection_display()  # Update the display to show correct selections
+            page_label.config(text=f"Page: {page}")
+
+            # Get the next page ready while this one is being looked at
+            if clips:
+                prefetcher.prefetch(clip_fetcher, page + 1)
+
+        # Fetch clips for the desired page off the Tk thread
+        page_loader.load(lambda: twitchtools.fetch_clips(clip_fetcher, limit=30, page=page), on_loaded)
+
     def next_page():
         page_var.set(page_var.get() + 1)
         fetch_and_display_clips(page_var.get())
@@ -833,23 +1163,17 @@ def create_manual_entry_tab(parent, twitch_downloader):
         close_button.pack(pady=10)
         close_button.config(state="disabled")
 
-        original_output_text = twitch_downloader.output_text
-        original_progress_bar = twitch_downloader.progress_bar
-
-        twitch_downloader.output_text = progress_text
-        twitch_downloader.progress_bar = progress_bar
+        output = JobOutput(progress_text, progress_bar)
 
         def download_thread():
             try:
                 clips = [{"id": url} for url in clip_urls]
-                twitch_downloader.bulk_download_clips(clips, download_dir, "manual")
+                twitch_downloader.bulk_download_clips(clips, download_dir, "manual", output)
                 progress_window.after(0, lambda: progress_text.insert(tk.END, "All clips have been downloaded and processed.\n"))
             except Exception as e:
                 error_message = f"An error occurred: {str(e)}\n"
                 progress_window.after(0, lambda: progress_text.insert(tk.END, error_message))
             finally:
-                twitch_downloader.output_text = original_output_text
-                twitch_downloader.progress_bar = original_progress_bar
                 progress_window.after(0, lambda: close_button.config(state="normal"))
 
         thread = threading.Thread(target=download_thread)
@@ -0,0 +1,58 @@
+import os
+
+# Codecs the rendered chat can be stored in when it goes through a file
+# rather than being streamed into the combine. All of them keep the alpha
+# channel; they trade file size against encode and decode speed, which
+# bench_overlay_codecs.py measures on the local machine.
+#   extension   - container for the intermediate file
+#   output_args - ffmpeg args the chat renderer encodes with
+#   input_args  - ffmpeg args needed in front of the file when decoding it
+OVERLAY_CODECS = {
+    "prores": {
+        "label": "ProRes 4444",
+        "extension": ".mov",
+        "output_args": "-c:v prores_ks -pix_fmt argb",
+        "input_args": [],
+    },
+    "qtrle": {
+        "label": "QuickTime Animation (qtrle)",
+        "extension": ".mov",
+        "output_args": "-c:v qtrle -pix_fmt argb",
+        "input_args": [],
+    },
+    "png": {
+        "label": "PNG in MOV",
+        "extension": ".mov",
+        "output_args": "-c:v png -pix_fmt rgba",
+        "input_args": [],
+    },
+    "ffv1": {
+        "label": "FFV1 with alpha",
+        "extension": ".mkv",
+        "output_args": "-c:v ffv1 -level 3 -pix_fmt bgra",
+        "input_args": [],
+    },
+    "vp9": {
+        "label": "VP9 with alpha",
+        "extension": ".webm",
+        "output_args": "-c:v libvpx-vp9 -pix_fmt yuva420p -b:v 0 -crf 20 -deadline realtime -cpu-used 8 -row-mt 1",
+        # ffmpeg's native VP9 decoder drops the alpha plane, libvpx keeps it
+        "input_args": ["-c:v", "libvpx-vp9"],
+    },
+}
+DEFAULT_OVERLAY_CODEC = "prores"
+
+
+def get_overlay_codec(name):
+    # Unknown names (e.g. from an older settings file) fall back to ProRes
+    return OVERLAY_CODECS.get(name, OVERLAY_CODECS[DEFAULT_OVERLAY_CODEC])
+
+
+def overlay_input_args(render_output):
+    # Decoder args for an already rendered file, looked up by its container so
+    # a codec change in the settings can't affect renders that already exist
+    extension = os.path.splitext(render_output)[1].lower()
+    for codec in OVERLAY_CODECS.values():
+        if codec["extension"] == extension and codec["input_args"]:
+            return list(codec["input_args"])
+    return []
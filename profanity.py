@@ -0,0 +1,162 @@
+import hashlib
+import os
+import re
+import threading
+
+# Word lists live in lexicons/<language>.txt, with optional per-channel
+# additions in lexicons/channels/<login>.txt. One entry per line:
+#   ass        the whole word only ("ass", not "assume")
+#   fuck*      any word starting with it ("fucking", "fucker")
+#   !damn      (channel lists) don't mute this word for the channel
+# Lines starting with # are comments.
+LEXICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicons")
+DEFAULT_LANGUAGE = "en"
+
+TOKEN_PATTERN = re.compile(r"[\w*']+")
+# Part of every matcher's version; bump it when the matching rules change so
+# swear words cached with the old rules are found again
+MATCHING_RULES_VERSION = 2
+
+
+class TrieNode:
+    __slots__ = ("children", "letter", "word_end", "prefix_end")
+
+    def __init__(self, letter=None):
+        self.children = {}
+        self.letter = letter
+        self.word_end = False
+        self.prefix_end = False
+
+
+class ProfanityMatcher:
+    # Compiles a lexicon into a trie once; matching walks it as an automaton.
+    # Spoken and transcribed swearing is rarely spelled cleanly, so a letter
+    # may repeat ("fuuuck") and "*" stands in for any letters ("f**k").
+    def __init__(self, entries):
+        self.entries = sorted(set(entries))
+        self.root = TrieNode()
+        for entry in self.entries:
+            self.add(entry)
+        self.version = hashlib.sha256(
+            "\n".join([str(MATCHING_RULES_VERSION)] + self.entries).encode("utf-8")).hexdigest()[:16]
+        # Word text -> bool. Transcripts repeat the same words over and over,
+        # so after the first few minutes nearly every word is a dict lookup.
+        self.results = {}
+
+    def add(self, entry):
+        prefix = entry.endswith("*")
+        node = self.root
+        for letter in entry.rstrip("*"):
+            child = node.children.get(letter)
+            if child is None:
+                child = node.children[letter] = TrieNode(letter)
+            node = child
+        if prefix:
+            node.prefix_end = True
+        else:
+            node.word_end = True
+
+    def match_token(self, token):
+        # Runs the token through the trie tracking every node it could be at,
+        # and whether a literal letter has matched on the way there. A match
+        # made only of wildcards ("***" for "ass") is just censored text.
+        states = {(self.root, False)}
+        for char in token:
+            next_states = set()
+            for node, literal in states:
+                if node.prefix_end and literal:
+                    return True
+                if char == "*":
+                    next_states.update((child, literal) for child in node.children.values())
+                    if node.letter is not None:
+                        next_states.add((node, literal))
+                    continue
+                child = node.children.get(char)
+                if child is not None:
+                    next_states.add((child, True))
+                if char == node.letter:
+                    next_states.add((node, True))
+            if not next_states:
+                return False
+            states = next_states
+        return any(literal and (node.word_end or node.prefix_end) for node, literal in states)
+
+    def is_profane(self, text):
+        result = self.results.get(text)
+        if result is None:
+            # A transcript word can hold several tokens ("mother-fucker") and
+            # punctuation; it matches if any of its tokens does
+            tokens = (token.strip("'") for token in TOKEN_PATTERN.findall(text.lower()))
+            result = any(self.match_token(token) for token in tokens if token)
+            self.results[text] = result
+        return result
+
+    def find_matches(self, words):
+        # Returns (text, start, end) for every matching word, in one pass
+        # over a transcript's word list
+        results = self.results
+        matches = []
+        for word in words:
+            result = results.get(word.text)
+            if result is None:
+                result = self.is_profane(word.text)
+            if result:
+                matches.append((word.text, word.start, word.end))
+        return matches
+
+
+def read_lexicon(path):
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip().lower()
+            if line and not line.startswith("#"):
+                entries.append(line)
+    return entries
+
+
+def lexicon_files(language, channel=None):
+    paths = [os.path.join(LEXICON_DIR, f"{language}.txt")]
+    if channel:
+        paths.append(os.path.join(LEXICON_DIR, "channels", f"{channel.lower()}.txt"))
+    return paths
+
+
+def load_entries(language, channel=None):
+    language_path, *channel_paths = lexicon_files(language, channel)
+    if not os.path.exists(language_path):
+        print(f"No profanity lexicon for '{language}', using '{DEFAULT_LANGUAGE}'")
+        language_path = os.path.join(LEXICON_DIR, f"{DEFAULT_LANGUAGE}.txt")
+    entries = set(read_lexicon(language_path))
+    for path in channel_paths:
+        if not os.path.exists(path):
+            continue
+        for entry in read_lexicon(path):
+            if entry.startswith("!"):
+                entries.discard(entry[1:])
+            else:
+                entries.add(entry)
+    return entries
+
+
+matchers = {}
+matchers_lock = threading.Lock()
+
+
+def get_matcher(language=DEFAULT_LANGUAGE, channel=None):
+    # Matchers are built once per language and channel, and rebuilt when one
+    # of their lexicon files changes
+    mtimes = []
+    for path in lexicon_files(language, channel):
+        try:
+            mtimes.append(os.path.getmtime(path))
+        except OSError:
+            mtimes.append(None)
+    key = (language, channel.lower() if channel else None)
+    with matchers_lock:
+        cached = matchers.get(key)
+        if cached is not None and cached[0] == mtimes:
+            return cached[1]
+        matcher = ProfanityMatcher(load_entries(language, channel))
+        matchers[key] = (mtimes, matcher)
+        return matcher
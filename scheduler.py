@@ -0,0 +1,183 @@
+import collections
+import concurrent.futures
+import threading
+
+
+class Stage:
+    # One step of a job. fn is called with the results of the stages named in
+    # deps, in that order, and runs on the pool for its kind. If fn returns a
+    # Future, the stage finishes when that Future does, with its result; the
+    # pool thread is free in the meantime (e.g. while an API does the work).
+    def __init__(self, name, kind, fn, deps=()):
+        self.name = name
+        self.kind = kind
+        self.fn = fn
+        self.deps = tuple(deps)
+
+
+class StageScheduler:
+    # Runs jobs made of stages that depend on each other (a DAG). Each kind of
+    # stage gets its own thread pool sized for the resource it uses, e.g.
+    # network downloads, CPU encoding or an external API. A stage is only
+    # submitted once everything it depends on has finished, so no worker ever
+    # sits blocked on another stage's future, and later jobs' network stages
+    # run while earlier jobs are still encoding.
+    def __init__(self, pool_sizes):
+        self.pools = {}
+        self.pool_sizes = {}
+        self.lock = threading.Lock()
+        for kind, size in pool_sizes.items():
+            self.pools[kind] = concurrent.futures.ThreadPoolExecutor(max_workers=size, thread_name_prefix=kind)
+            self.pool_sizes[kind] = size
+
+    def resize(self, kind, size):
+        # Running and queued stages finish on the old pool; new ones use the new
+        with self.lock:
+            if self.pool_sizes.get(kind) == size:
+                return
+            old_pool = self.pools.get(kind)
+            self.pools[kind] = concurrent.futures.ThreadPoolExecutor(max_workers=size, thread_name_prefix=kind)
+            self.pool_sizes[kind] = size
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    def submit_stage(self, kind, fn, *args):
+        with self.lock:
+            pool = self.pools[kind]
+        return pool.submit(fn, *args)
+
+    def submit_job(self, stages, name=None, on_kind_done=None):
+        # Returns a Future for the whole job. It resolves to a dict of every
+        # stage's result, or to the first stage exception, after which stages
+        # that have not started yet are skipped; either way only once no
+        # stage of the job is running any more, so the caller can clean up
+        # after it. on_kind_done(kind) is called once all of the job's stages
+        # of that kind have finished or been skipped, e.g. to tell when a job
+        # is past its downloads.
+        job = Job(self, stages, name, on_kind_done)
+        job.start()
+        return job.future
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            pools = list(self.pools.values())
+        for pool in pools:
+            pool.shutdown(wait=wait)
+
+
+class Job:
+    def __init__(self, scheduler, stages, name=None, on_kind_done=None):
+        self.scheduler = scheduler
+        self.name = name
+        self.on_kind_done = on_kind_done
+        self.stages = {stage.name: stage for stage in stages}
+        self.kinds_left = collections.Counter(stage.kind for stage in stages)
+        self.kinds_running = collections.Counter()
+        self.kinds_done = set()
+        self.running = 0
+        self.future = concurrent.futures.Future()
+        self.results = {}
+        self.lock = threading.Lock()
+        self.error = None
+
+        self.waiting_on = {}
+        self.dependents = {name: [] for name in self.stages}
+        for stage in stages:
+            self.waiting_on[stage.name] = len(stage.deps)
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {stage.name} depends on unknown stage {dep}")
+                self.dependents[dep].append(stage.name)
+
+    def start(self):
+        ready = [name for name, count in self.waiting_on.items() if count == 0]
+        if not ready:
+            self.future.set_exception(ValueError("Job has no stage without dependencies"))
+            return
+        with self.lock:
+            # Counted up front so the first stage to finish can't see the job
+            # as idle before its siblings are submitted
+            for name in ready:
+                self.mark_running(name)
+        for name in ready:
+            self.submit(name)
+
+    def mark_running(self, name):
+        # Caller holds self.lock
+        self.running += 1
+        self.kinds_running[self.stages[name].kind] += 1
+
+    def submit(self, name):
+        stage = self.stages[name]
+        args = [self.results[dep] for dep in stage.deps]
+        try:
+            future = self.scheduler.submit_stage(stage.kind, stage.fn, *args)
+        except Exception as e:
+            self.settle(name, error=e)
+            return
+        future.add_done_callback(lambda f, name=name: self.stage_done(name, f))
+
+    def stage_done(self, name, future):
+        try:
+            result = future.result()
+        except BaseException as e:
+            self.settle(name, error=e)
+            return
+        if isinstance(result, concurrent.futures.Future):
+            result.add_done_callback(lambda f, name=name: self.stage_done(name, f))
+            return
+        self.settle(name, result=result)
+
+    def settle(self, name, result=None, error=None):
+        # Records a stage that finished or failed. After the first failure
+        # nothing new is submitted, but the job only resolves once the stages
+        # still running have settled too.
+        ready = []
+        kind = self.stages[name].kind
+        with self.lock:
+            self.running -= 1
+            self.kinds_running[kind] -= 1
+            if error is not None and self.error is None:
+                self.error = error
+            if self.error is None:
+                self.results[name] = result
+                self.kinds_left[kind] -= 1
+                for dependent in self.dependents[name]:
+                    self.waiting_on[dependent] -= 1
+                    if self.waiting_on[dependent] == 0:
+                        ready.append(dependent)
+                        self.mark_running(dependent)
+                kinds = [kind] if self.kinds_left[kind] == 0 else []
+            else:
+                # Kinds with nothing left running will run no more stages
+                kinds = [k for k in self.kinds_left if self.kinds_running[k] == 0]
+            kinds = [k for k in kinds if k not in self.kinds_done]
+            self.kinds_done.update(kinds)
+            finished = self.running == 0 and (self.error is not None or len(self.results) == len(self.stages))
+            error = self.error
+
+        if self.on_kind_done is not None:
+            for done_kind in kinds:
+                self.on_kind_done(done_kind)
+        for dependent in ready:
+            self.submit(dependent)
+        if finished:
+            if error is not None:
+                self.future.set_exception(error)
+            else:
+                self.future.set_result(dict(self.results))
+
+
+def chain(future, fn):
+    # Returns a Future for fn(future's result), for async stages that need to
+    # post-process what they wait on; exceptions carry over
+    chained = concurrent.futures.Future()
+
+    def done(f):
+        try:
+            chained.set_result(fn(f.result()))
+        except BaseException as e:
+            chained.set_exception(e)
+
+    future.add_done_callback(done)
+    return chained
@@ -0,0 +1,65 @@
+import re
+import shlex
+import shutil
+import subprocess
+
+import pytest
+
+from downloader import TwitchDownloader
+
+pytestmark = pytest.mark.skipif(not shutil.which("ffmpeg"), reason="needs ffmpeg")
+
+
+@pytest.fixture
+def twitch_downloader(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return TwitchDownloader(None)
+
+
+@pytest.fixture
+def video_file(tmp_path):
+    path = str(tmp_path / "video.mp4")
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-y",
+        "-f", "lavfi", "-i", "testsrc2=s=320x180:r=24:d=2",
+        "-f", "lavfi", "-i", "sine=duration=2",
+        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest", path
+    ], check=True)
+    return path
+
+
+def fake_renderer(duration, fail=False):
+    # Stands in for TwitchDownloaderCLI chatrender: an ffmpeg test pattern
+    # written with the render's output args into the named pipe
+    def chat_render_command(chat_output, render_output, output_args, video_size):
+        if fail:
+            return ["ffmpeg", "-v", "error", "-i", "missing-chat.json", render_output]
+        source = f"testsrc2=s=80x60:r=12:d={duration},format=argb"
+        return ["ffmpeg", "-v", "error", "-f", "lavfi", "-i", source,
+                *shlex.split(output_args.replace("{save_path}", render_output))]
+    return chat_render_command
+
+
+def streams(path):
+    result = subprocess.run(["ffmpeg", "-hide_banner", "-i", path], capture_output=True, text=True)
+    return sorted(re.findall(r"Stream #\S+: (Audio|Video)", result.stderr))
+
+
+@pytest.mark.parametrize("chat_duration", [2, 30])
+def test_chat_streams_through_the_pipe(twitch_downloader, video_file, tmp_path, monkeypatch, chat_duration):
+    # A chat longer than the video is cut off when the video ends
+    d = twitch_downloader
+    monkeypatch.setattr(d, "chat_render_command", fake_renderer(chat_duration))
+    combined = str(tmp_path / "combined.mp4")
+
+    assert d.stream_render_and_combine(video_file, "chat.json", combined, [], str(tmp_path), "clip", (320, 180))
+    assert streams(combined) == ["Audio", "Video"]
+    assert [name for name in tmp_path.iterdir() if name.name.startswith("chat-render-")] == []
+
+
+def test_failed_render_fails_the_combine(twitch_downloader, video_file, tmp_path, monkeypatch):
+    d = twitch_downloader
+    monkeypatch.setattr(d, "chat_render_command", fake_renderer(2, fail=True))
+    combined = str(tmp_path / "combined.mp4")
+
+    assert not d.stream_render_and_combine(video_file, "chat.json", combined, [], str(tmp_path), "clip", (320, 180))
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from fake_gql_server import start_server
+from twitchtools import GQLClient, TwitchAPIError, gql_data
+
+
+def clip_query(slug):
+    return f'query {{ clip(slug: "{slug}") {{ id slug }} }}'
+
+
+@pytest.fixture
+def make_client():
+    # A fake GQL server and a client that backs off in milliseconds
+    servers = []
+
+    def make(max_retries=5, **options):
+        options.setdefault("retry_after", 0)
+        server = start_server(**options)
+        servers.append(server)
+        client = GQLClient(url=f"http://127.0.0.1:{server.server_port}/gql", rate=1000, burst=1000,
+                           max_retries=max_retries, backoff_base=0.01, backoff_cap=0.05)
+        return server, client
+
+    random.seed(0)
+    yield make
+    for server in servers:
+        server.shutdown()
+
+
+def test_recovers_from_throttling(make_client):
+    server, client = make_client(throttle_every=2)
+    for i in range(5):
+        assert client.execute(clip_query(f"slug{i}"))["data"]["clip"]["slug"] == f"slug{i}"
+    assert server.stats["throttled"] > 0
+    assert client.stats["throttled"] == server.stats["throttled"]
+    assert client.stats["retries"] == server.stats["throttled"]
+
+
+def test_recovers_from_server_errors(make_client):
+    server, client = make_client(error_rate=0.5, max_retries=10)
+    slugs = [f"slug{i}" for i in range(20)]
+    results = client.execute_batch([{"query": clip_query(slug), "variables": {}} for slug in slugs])
+    assert [result["data"]["clip"]["slug"] for result in results] == slugs
+    for slug in slugs:
+        assert client.execute(clip_query(slug))["data"]["clip"]["slug"] == slug
+    assert server.stats["errors"] > 0
+    assert client.stats["server_errors"] == server.stats["errors"]
+
+
+def test_recovers_from_gql_timeouts(make_client):
+    server, client = make_client(gql_error_rate=0.5, max_retries=10)
+    for i in range(10):
+        assert client.execute(clip_query(f"slug{i}"))["data"]["clip"]["slug"] == f"slug{i}"
+    assert server.stats["gql_errors"] > 0
+    assert client.stats["gql_errors"] == server.stats["gql_errors"]
+
+
+def test_raises_once_retries_are_exhausted(make_client):
+    server, client = make_client(error_rate=1.0, max_retries=2)
+    with pytest.raises(TwitchAPIError, match="after 3 attempts"):
+        client.execute(clip_query("slug"))
+    assert server.stats["errors"] == 3
+
+
+def test_permanent_errors_are_not_retried(make_client):
+    server, client = make_client()
+    with pytest.raises(TwitchAPIError, match="unsupported query"):
+        client.execute("query { nonsense }")
+    assert client.stats["retries"] == 0
+    assert server.stats["ok"] == 1
+
+
+def test_failed_operation_fails_only_its_own_future(make_client):
+    server, client = make_client()
+    futures = [client.submit(clip_query(f"slug{i}")) for i in range(4)]
+    bad = client.submit("query { nonsense }")
+    futures += [client.submit(clip_query(f"slug{i}")) for i in range(4, 8)]
+
+    assert [f.result(timeout=5)["data"]["clip"]["slug"] for f in futures] == [f"slug{i}" for i in range(8)]
+    with pytest.raises(TwitchAPIError, match="unsupported query"):
+        bad.result(timeout=5)
+    assert server.stats["ok"] == 1  # All in one batched request
+
+
+def test_partial_data_is_kept():
+    partial = {"data": {"clip": None}, "errors": [{"message": "clip not found"}]}
+    assert gql_data(partial) is partial
+    with pytest.raises(TwitchAPIError):
+        gql_data({"data": None, "errors": [{"message": "bad query"}]})
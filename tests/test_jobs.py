@@ -0,0 +1,108 @@
+import concurrent.futures
+import os
+import time
+
+import pytest
+
+from downloader import TwitchDownloader
+
+CLIP = {"slug": "FunnyClip", "title": "Funny clip"}
+
+
+@pytest.fixture
+def twitch_downloader(tmp_path, monkeypatch):
+    # Every external tool stubbed out; each stub records what it was given
+    monkeypatch.chdir(tmp_path)
+    d = TwitchDownloader(None)
+    calls = []
+
+    def download_clip(clip_id, temp_dir, safe_title):
+        calls.append(("download", clip_id))
+        path = os.path.join(temp_dir, f"{safe_title}.mp4")
+        open(path, "w").close()
+        return path
+
+    def download_chat(clip_id, temp_dir, safe_title):
+        calls.append(("chat", clip_id))
+        path = os.path.join(temp_dir, f"{safe_title}_chat.json")
+        with open(path, "w") as f:
+            f.write('{"comments": [{"message": "hi"}]}')
+        return path
+
+    def transcribe_audio_async(audio_file, channel=None, chunked=False):
+        calls.append(("transcribe", channel, chunked))
+        future = concurrent.futures.Future()
+        future.set_result(([], [("damn", 1000, 1300)]))
+        return future
+
+    def render_chat(chat_file, temp_dir, safe_title, video_size):
+        calls.append(("render", os.path.basename(chat_file), video_size))
+        return os.path.join(temp_dir, "render.mov")
+
+    def combine_clip_and_chat(clip_output, render_output, combined_output, clip_title, swear_timestamps, video_size):
+        calls.append(("combine", os.path.basename(combined_output), swear_timestamps))
+
+    monkeypatch.setattr(d, "download_clip", download_clip)
+    monkeypatch.setattr(d, "download_chat", download_chat)
+    monkeypatch.setattr(d, "transcribe_audio_async", transcribe_audio_async)
+    monkeypatch.setattr(d, "probe_video", lambda video_file: (1280, 720))
+    monkeypatch.setattr(d, "render_chat", render_chat)
+    monkeypatch.setattr(d, "combine_clip_and_chat", combine_clip_and_chat)
+    d.calls = calls
+    yield d
+    d.scheduler.shutdown(wait=False)
+
+
+def test_clip_job_runs_every_stage(twitch_downloader, tmp_path):
+    d = twitch_downloader
+    d.download_and_process_clip(CLIP, str(tmp_path), "streamer").result(timeout=5)
+
+    assert sorted(d.calls, key=lambda call: call[0]) == [
+        ("chat", "https://clips.twitch.tv/FunnyClip"),
+        ("combine", "Funny clip_combined.mp4", [("damn", 1000, 1300)]),
+        ("download", "https://clips.twitch.tv/FunnyClip"),
+        ("render", "Funny clip_chat.json", (1280, 720)),
+        ("transcribe", "streamer", False),
+    ]
+    assert not os.path.exists(tmp_path / "temp_Funny clip")
+
+
+def test_failed_stage_waits_for_running_download(twitch_downloader, tmp_path, monkeypatch):
+    # The chat fails while the clip is still downloading into the temp dir,
+    # which must not be removed until the download is done
+    d = twitch_downloader
+    seen = []
+
+    def download_clip(clip_id, temp_dir, safe_title):
+        time.sleep(0.3)
+        seen.append(os.path.isdir(temp_dir))
+        return os.path.join(temp_dir, f"{safe_title}.mp4")
+
+    def download_chat(clip_id, temp_dir, safe_title):
+        raise RuntimeError("chat download failed")
+
+    monkeypatch.setattr(d, "download_clip", download_clip)
+    monkeypatch.setattr(d, "download_chat", download_chat)
+    d.download_and_process_clip(CLIP, str(tmp_path), "streamer").result(timeout=5)
+
+    assert seen == [True]
+    assert not os.path.exists(tmp_path / "temp_Funny clip")
+    assert not any(call[0] in ("render", "combine") for call in d.calls)
+
+
+def test_chat_without_messages_skips_render(twitch_downloader, tmp_path, monkeypatch):
+    d = twitch_downloader
+    combined = []
+
+    def download_chat(clip_id, temp_dir, safe_title):
+        path = os.path.join(temp_dir, "chat.json")
+        with open(path, "w") as f:
+            f.write('{"comments": []}')
+        return path
+
+    monkeypatch.setattr(d, "download_chat", download_chat)
+    monkeypatch.setattr(d, "combine_without_chat", lambda *args: combined.append(args[3]))
+    d.download_and_process_clip(CLIP, str(tmp_path), "streamer").result(timeout=5)
+
+    assert combined == ["Funny clip"]
+    assert not any(call[0] in ("render", "combine") for call in d.calls)
@@ -0,0 +1,19 @@
+import pytest
+
+from profanity import ProfanityMatcher
+
+
+@pytest.fixture
+def matcher():
+    return ProfanityMatcher(["ass", "asshole*", "fuck*", "shit*"])
+
+
+@pytest.mark.parametrize("text", ["ass", "Ass!", "fucking", "fuuuck", "f**k", "F**k?", "sh*t", "a**", "***hole",
+                                  "mother-fucker"])
+def test_matches(matcher, text):
+    assert matcher.is_profane(text)
+
+
+@pytest.mark.parametrize("text", ["assume", "hello", "***", "****", "****ing", "*", "f*"])
+def test_does_not_match(matcher, text):
+    assert not matcher.is_profane(text)
@@ -0,0 +1,88 @@
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+from scheduler import Stage, StageScheduler
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = StageScheduler({"network": 2, "encode": 1, "api": 1})
+    yield scheduler
+    scheduler.shutdown(wait=False)
+
+
+def test_stages_run_after_their_deps(scheduler):
+    stages = [
+        Stage("download", "network", lambda: 2),
+        Stage("chat", "network", lambda: 3),
+        Stage("combine", "encode", lambda video, chat: video * chat, deps=["download", "chat"]),
+    ]
+    assert scheduler.submit_job(stages).result(timeout=5) == {"download": 2, "chat": 3, "combine": 6}
+
+
+def test_failure_waits_for_running_stages(scheduler):
+    # A stage failing while a sibling still runs must not resolve the job
+    # (and let its caller clean up) under the sibling's feet
+    events = []
+    kinds_done = []
+
+    def download():
+        time.sleep(0.3)
+        events.append("download finished")
+
+    def download_chat():
+        raise RuntimeError("chat failed")
+
+    stages = [
+        Stage("download", "network", download),
+        Stage("chat", "network", download_chat),
+        Stage("combine", "encode", lambda *args: events.append("combined"), deps=["download", "chat"]),
+    ]
+    job = scheduler.submit_job(stages, on_kind_done=kinds_done.append)
+    job.add_done_callback(lambda f: events.append("job done"))
+
+    with pytest.raises(RuntimeError, match="chat failed"):
+        job.result(timeout=5)
+    assert events == ["download finished", "job done"]
+    assert sorted(kinds_done) == ["encode", "network"]
+
+
+def test_failure_waits_for_async_stages(scheduler):
+    # A stage returning a Future counts as running until that Future is done
+    pending = concurrent.futures.Future()
+
+    def fail():
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    stages = [
+        Stage("transcribe", "api", lambda: pending),
+        Stage("download", "network", fail),
+    ]
+    job = scheduler.submit_job(stages)
+    time.sleep(0.2)
+    assert not job.done()
+
+    pending.set_result([])
+    with pytest.raises(ValueError):
+        job.result(timeout=5)
+
+
+def test_kind_done_once_per_kind(scheduler):
+    calls = []
+    lock = threading.Lock()
+
+    def on_kind_done(kind):
+        with lock:
+            calls.append(kind)
+
+    stages = [
+        Stage("download", "network", lambda: None),
+        Stage("probe", "network", lambda video: None, deps=["download"]),
+        Stage("combine", "encode", lambda video: None, deps=["probe"]),
+    ]
+    scheduler.submit_job(stages, on_kind_done=on_kind_done).result(timeout=5)
+    assert calls == ["network", "encode"]
@@ -0,0 +1,201 @@
+import concurrent.futures
+import shutil
+import subprocess
+import time
+
+import assemblyai as aai
+import pytest
+
+import downloader
+import transcriptcache
+from downloader import TwitchDownloader
+from fake_transcription_server import start_server
+from profanity import get_matcher
+from transcription import TranscriptionService, plan_chunks
+
+BYTES_PER_SECOND = 3000
+
+
+@pytest.fixture
+def make_server():
+    # Starts fake AssemblyAI servers and points the SDK at the last one
+    servers = []
+
+    def make(**options):
+        options.setdefault("processing_time", 0.2)
+        options.setdefault("bytes_per_second", BYTES_PER_SECOND)
+        server = start_server(**options)
+        aai.settings.base_url = server.url()
+        aai.settings.api_key = "fake"
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def twitch_downloader(tmp_path, monkeypatch):
+    # Default settings, and a transcript cache of its own
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(transcriptcache, "transcript_cache", None)
+    d = TwitchDownloader(None)
+    d.transcription_service = TranscriptionService(max_in_flight=2, poll_interval=0.05)
+    yield d
+    d.transcription_service.shutdown()
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def fake_upload(server, duration=30.0):
+    # Stands in for TwitchDownloader.upload_audio: uploads as many bytes as
+    # the extract of [start, end) would have
+    def upload_audio(media_file, start=None, end=None):
+        end = duration if end is None else end
+        return server.add_upload(int(((end - (start or 0.0)) * BYTES_PER_SECOND)))
+    return upload_audio
+
+
+def test_in_flight_limit(make_server):
+    server = make_server(processing_time=0.3)
+    service = TranscriptionService(max_in_flight=2, poll_interval=0.05)
+    try:
+        futures = [service.submit(server.add_upload(BYTES_PER_SECOND * 2)) for _ in range(6)]
+        transcripts = [future.result(timeout=10) for future in futures]
+    finally:
+        service.shutdown()
+
+    assert all(t.status == aai.TranscriptStatus.completed for t in transcripts)
+    assert all(len(t.words) == 5 for t in transcripts)
+    assert server.stats["created"] == 6
+    assert server.stats["max_processing"] == 2
+
+
+def test_raised_limit_admits_waiting_audio(make_server):
+    server = make_server(processing_time=0.5)
+    service = TranscriptionService(max_in_flight=1, poll_interval=0.05)
+    try:
+        futures = [service.submit(server.add_upload(BYTES_PER_SECOND)) for _ in range(3)]
+        wait_until(lambda: server.stats["created"] == 1)
+        service.set_max_in_flight(3)
+        wait_until(lambda: server.stats["created"] == 3, timeout=0.4)
+        for future in futures:
+            future.result(timeout=10)
+    finally:
+        service.shutdown()
+
+
+def test_failed_transcript(make_server):
+    server = make_server(error_rate=1.0)
+    service = TranscriptionService(max_in_flight=2, poll_interval=0.05)
+    try:
+        future = service.submit(server.add_upload(BYTES_PER_SECOND))
+        with pytest.raises(aai.types.TranscriptError):
+            future.result(timeout=10)
+    finally:
+        service.shutdown()
+
+
+def test_shutdown_resolves_every_future(make_server):
+    server = make_server(processing_time=30)
+    service = TranscriptionService(max_in_flight=1, poll_interval=0.05)
+    in_flight = service.submit(server.add_upload(BYTES_PER_SECOND))
+    waiting = service.submit(server.add_upload(BYTES_PER_SECOND))
+    wait_until(lambda: server.stats["created"] == 1)
+    service.shutdown()
+
+    assert isinstance(in_flight.exception(timeout=1), RuntimeError)
+    assert waiting.cancelled()
+
+
+def test_shutdown_resolves_transcription_jobs(make_server, twitch_downloader, monkeypatch):
+    server = make_server(processing_time=30)
+    d = twitch_downloader
+    d.transcription_service.set_max_in_flight(1)
+    monkeypatch.setattr(downloader, "audio_hash", lambda media_file: None)
+    monkeypatch.setattr(d, "upload_audio", fake_upload(server, duration=5.0))
+
+    in_flight = d.transcribe_audio_async("first.mp4")
+    waiting = d.transcribe_audio_async("second.mp4")
+    chunked = concurrent.futures.Future()
+    matcher = get_matcher(d.profanity_language)
+    d.transcribe_chunks("third.mp4", plan_chunks(5.0, [], 2), matcher, None, chunked)
+    wait_until(lambda: server.stats["created"] == 1)
+    d.transcription_service.shutdown()
+
+    assert in_flight.result(timeout=1) == (None, [])
+    assert waiting.result(timeout=1) == (None, [])
+    assert chunked.result(timeout=1) == (None, [])
+
+
+def test_chunks_are_stitched_in_order(make_server, twitch_downloader, monkeypatch):
+    # The fake server puts a word every 400 ms from the start of each upload.
+    # Cut at 10 s and 20 s with 2 s of overlap, the stitched words must be
+    # the same grid a single transcript of the whole 30 s would have.
+    server = make_server(swear_rate=0.2)
+    d = twitch_downloader
+    monkeypatch.setattr(d, "upload_audio", fake_upload(server))
+    matcher = get_matcher(d.profanity_language)
+    chunks = plan_chunks(30.0, [], 10)
+    assert [(c.upload_start, c.upload_end) for c in chunks] == [(0.0, 12.0), (8.0, 22.0), (18.0, 30.0)]
+
+    done = concurrent.futures.Future()
+    d.transcribe_chunks("talk.mp4", chunks, matcher, "talk-key", done)
+    words, swear_timestamps = done.result(timeout=10)
+
+    assert [word.start for word in words] == list(range(0, 29700, 400))
+    assert swear_timestamps
+    assert swear_timestamps == matcher.find_matches(words)
+    assert transcriptcache.get_transcript_cache().get_words("talk-key") == words
+
+
+def test_failed_chunk_fails_the_transcript(make_server, twitch_downloader, monkeypatch):
+    server = make_server()
+    d = twitch_downloader
+    uploads = fake_upload(server)
+    calls = []
+
+    def upload_audio(media_file, start=None, end=None):
+        calls.append(start)
+        if len(calls) == 2:
+            raise RuntimeError("upload failed")
+        return uploads(media_file, start, end)
+
+    monkeypatch.setattr(d, "upload_audio", upload_audio)
+    done = concurrent.futures.Future()
+    d.transcribe_chunks("talk.mp4", plan_chunks(30.0, [], 10), get_matcher(d.profanity_language), "talk-key", done)
+
+    assert done.result(timeout=10) == (None, [])
+    assert transcriptcache.get_transcript_cache().get_words("talk-key") is None
+
+
+@pytest.mark.skipif(not (shutil.which("ffmpeg") and shutil.which("ffprobe")), reason="needs ffmpeg and ffprobe")
+def test_chunked_transcription_end_to_end(make_server, twitch_downloader, tmp_path):
+    # Real extracts and uploads of a tone broken by a second of silence every
+    # 8 s, so it is cut at 7.5, 15.5 and 23.5 s into four parts, and cached
+    # by the hash scan_audio takes while looking for silences
+    server = make_server(processing_time=0.1)
+    d = twitch_downloader
+    d.transcription_chunk_seconds = 10
+    audio_file = str(tmp_path / "talk.m4a")
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-y",
+        "-f", "lavfi", "-i", "sine=frequency=440:duration=32",
+        "-af", "volume=enable='between(mod(t,8),7,8)':volume=0",
+        "-c:a", "aac", audio_file
+    ], check=True)
+
+    words, swear_timestamps = d.transcribe_audio_async(audio_file, chunked=True).result(timeout=30)
+    assert words
+    starts = [word.start for word in words]
+    assert starts == sorted(set(starts))
+    assert server.stats["created"] == 4
+
+    assert d.transcribe_audio_async(audio_file, chunked=True).result(timeout=30) == (words, swear_timestamps)
+    assert server.stats["created"] == 4
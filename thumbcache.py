@@ -0,0 +1,152 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+import requests
+from PIL import Image, ImageTk
+
+THUMBNAIL_SIZE = (240, 135)
+thumbnail_session = requests.Session()
+
+
+def load_thumbnail(url):
+    # Downloads and resizes a clip thumbnail. Safe to call off the Tk thread;
+    # only the PhotoImage has to be created on it.
+    response = thumbnail_session.get(url, timeout=10)
+    response.raise_for_status()
+    img = Image.open(BytesIO(response.content))
+    return img.convert("RGB").resize(THUMBNAIL_SIZE, Image.LANCZOS)
+
+
+class ThumbnailCache:
+    # Two-level thumbnail cache. Level one is a directory of already resized
+    # thumbnails named by the hash of their URL, trimmed to max_disk_bytes by
+    # least recent use. Level two is an LRU of ready-to-use PhotoImages,
+    # holding at most max_memory_items; it must only be used from the Tk thread.
+    def __init__(self, cache_dir="thumbnail_cache", max_disk_bytes=200 * 1024 * 1024, max_memory_items=300):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_items = max_memory_items
+        self.photos = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "memory_misses": 0,
+            "disk_hits": 0,
+            "disk_misses": 0,
+        }
+        os.makedirs(cache_dir, exist_ok=True)
+        self.disk_bytes = sum(entry.stat().st_size for entry in os.scandir(cache_dir) if entry.is_file())
+
+    def path_for(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".jpg")
+
+    def get_photo(self, url):
+        photo = self.photos.get(url)
+        with self.lock:
+            if photo is None:
+                self.stats["memory_misses"] += 1
+                return None
+            self.stats["memory_hits"] += 1
+        self.photos.move_to_end(url)
+        return photo
+
+    def put_photo(self, url, img):
+        # Creates the PhotoImage for a loaded thumbnail and keeps it
+        photo = ImageTk.PhotoImage(img)
+        self.photos[url] = photo
+        self.photos.move_to_end(url)
+        while len(self.photos) > self.max_memory_items:
+            self.photos.popitem(last=False)
+        return photo
+
+    def load_image(self, url):
+        # Returns the resized thumbnail from disk, or downloads and stores it.
+        # Safe to call from worker threads.
+        path = self.path_for(url)
+        try:
+            img = Image.open(path)
+            img.load()
+            os.utime(path)  # Mark as recently used for disk eviction
+            with self.lock:
+                self.stats["disk_hits"] += 1
+            return img
+        except (OSError, ValueError):
+            with self.lock:
+                self.stats["disk_misses"] += 1
+
+        img = load_thumbnail(url)
+        self.store_image(path, img)
+        return img
+
+    def store_image(self, path, img):
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            img.save(temp_path, "JPEG", quality=90)
+            size = os.path.getsize(temp_path)
+            with self.lock:
+                # Two workers can store the same URL; only count the bytes
+                # the replaced file didn't already account for
+                try:
+                    size -= os.path.getsize(path)
+                except OSError:
+                    pass
+                os.replace(temp_path, path)
+                self.disk_bytes += size
+                over_budget = self.disk_bytes > self.max_disk_bytes
+        except OSError as e:
+            print(f"Error caching thumbnail: {e}")
+            return
+        if over_budget:
+            self.evict_disk()
+
+    def evict_disk(self):
+        # Deletes least recently used thumbnails until the cache is back to
+        # 90% of its budget, so eviction doesn't run on every store
+        with self.lock:
+            entries = [entry for entry in os.scandir(self.cache_dir) if entry.is_file()]
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            total = sum(entry.stat().st_size for entry in entries)
+            target = self.max_disk_bytes * 0.9
+            for entry in entries:
+                if total <= target:
+                    break
+                try:
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                    total -= size
+                except OSError:
+                    pass
+            self.disk_bytes = total
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats["memory_items"] = len(self.photos)
+        stats["disk_bytes"] = self.disk_bytes
+        return stats
+
+    def stats_text(self):
+        stats = self.get_stats()
+        return (
+            f"Thumbnail cache - memory: {stats['memory_hits']} hits / {stats['memory_misses']} misses "
+            f"({stats['memory_items']} items), disk: {stats['disk_hits']} hits / {stats['disk_misses']} misses "
+            f"({stats['disk_bytes'] / (1024 * 1024):.1f} MB)"
+        )
+
+
+thumbnail_cache = None
+thumbnail_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache(max_disk_mb=200, max_memory_items=300):
+    # Returns the cache shared by all clip windows, creating it on first use
+    global thumbnail_cache
+    with thumbnail_cache_lock:
+        if thumbnail_cache is None:
+            thumbnail_cache = ThumbnailCache(
+                max_disk_bytes=int(max_disk_mb * 1024 * 1024),
+                max_memory_items=max_memory_items
+            )
+        return thumbnail_cache
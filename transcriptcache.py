@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from collections import namedtuple
+
+# What the cache keeps of a transcript: just the timed words
+TranscriptWord = namedtuple("TranscriptWord", "text start end")
+
+
+def audio_hash(media_file):
+    # Hashes the decoded audio rather than the file, so a re-download or a
+    # remux of the same audio still hits the cache. Returns None if the audio
+    # can't be decoded.
+    command = [
+        "ffmpeg", "-v", "error",
+        "-i", media_file,
+        "-map", "0:a:0",
+        "-f", "s16le",
+        "-"
+    ]
+    digest = hashlib.sha256()
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError as e:
+        print(f"Error hashing audio of {media_file}: {e}")
+        return None
+    with process.stdout:
+        for chunk in iter(lambda: process.stdout.read(1024 * 1024), b""):
+            digest.update(chunk)
+    if process.wait() != 0:
+        return None
+    return digest.hexdigest()
+
+
+class TranscriptCache:
+    # One JSON file per audio hash holding the transcript's words and, per
+    # lexicon version, the swear words found in them. A lexicon change only
+    # re-runs detection on the cached words; nothing is transcribed again.
+    def __init__(self, cache_dir="transcript_cache"):
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def load(self, key):
+        try:
+            with open(self.path_for(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get_words(self, key):
+        entry = self.load(key)
+        if entry is None:
+            return None
+        return [TranscriptWord(*word) for word in entry["words"]]
+
+    def get_swears(self, key, lexicon_version):
+        entry = self.load(key)
+        if entry is None or lexicon_version not in entry["swears"]:
+            return None
+        return [tuple(swear) for swear in entry["swears"][lexicon_version]]
+
+    def put(self, key, words, lexicon_version, swear_timestamps):
+        with self.lock:
+            entry = self.load(key)
+            if entry is None:
+                entry = {"words": [[word.text, word.start, word.end] for word in words], "swears": {}}
+            entry["swears"][lexicon_version] = [list(swear) for swear in swear_timestamps]
+            path = self.path_for(key)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(entry, f)
+                os.replace(temp_path, path)
+            except OSError as e:
+                print(f"Error caching transcript: {e}")
+
+
+transcript_cache = None
+transcript_cache_lock = threading.Lock()
+
+
+def get_transcript_cache():
+    global transcript_cache
+    with transcript_cache_lock:
+        if transcript_cache is None:
+            transcript_cache = TranscriptCache()
+        return transcript_cache
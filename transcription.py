@@ -0,0 +1,222 @@
+import collections
+import concurrent.futures
+import hashlib
+import re
+import subprocess
+import threading
+from collections import namedtuple
+import assemblyai as aai
+
+# Part of a long recording transcribed on its own. Words whose midpoint falls
+# in [start, end) belong to it; the audio sent is widened by an overlap on
+# both sides (upload_start, upload_end) so words at a cut aren't clipped.
+Chunk = namedtuple("Chunk", "start end upload_start upload_end")
+
+SILENCE_START = re.compile(r"silence_start: (-?[\d.]+)")
+SILENCE_END = re.compile(r"silence_end: (-?[\d.]+)")
+DURATION = re.compile(r"Duration: (\d+):(\d+):([\d.]+)")
+
+
+class TranscriptionService:
+    # Transcribes audio without tying up a thread per transcript. submit()
+    # queues an uploaded audio URL and returns a Future; one poller thread
+    # creates transcripts, at most max_in_flight at a time, and polls all of
+    # them until they complete. The Future resolves to the transcript
+    # response, or fails with aai.types.TranscriptError.
+    def __init__(self, max_in_flight=8, poll_interval=3.0):
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        self.waiting = collections.deque()  # (audio_url, config, future)
+        self.in_flight = {}  # Transcript id -> future
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopped = False
+
+    def submit(self, audio_url, config=None):
+        future = concurrent.futures.Future()
+        with self.condition:
+            self.waiting.append((audio_url, config, future))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+        return future
+
+    def set_max_in_flight(self, max_in_flight):
+        with self.condition:
+            self.max_in_flight = max_in_flight
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.stopped and not self.waiting and not self.in_flight:
+                    self.condition.wait()
+                if self.stopped:
+                    break
+                to_create = []
+                while self.waiting and len(self.in_flight) + len(to_create) < self.max_in_flight:
+                    to_create.append(self.waiting.popleft())
+                polling = list(self.in_flight.items())
+
+            try:
+                client = aai.Client.get_default().http_client
+            except Exception as e:  # e.g. no API key set
+                for _, _, future in to_create:
+                    if future.set_running_or_notify_cancel():
+                        future.set_exception(e)
+                to_create, polling = [], []
+            for audio_url, config, future in to_create:
+                self.create(client, audio_url, config, future)
+            for transcript_id, future in polling:
+                self.poll(client, transcript_id, future)
+
+            with self.condition:
+                # Wake early when new audio arrives and there's room for it
+                self.condition.wait_for(
+                    lambda: self.stopped or (self.waiting and len(self.in_flight) < self.max_in_flight),
+                    timeout=self.poll_interval
+                )
+
+    def create(self, client, audio_url, config, future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            request = aai.types.TranscriptRequest(audio_url=audio_url, **(config or {}))
+            response = aai.api.create_transcript(client, request)
+        except Exception as e:
+            future.set_exception(e)
+            return
+        with self.condition:
+            if not self.stopped:
+                self.in_flight[response.id] = future
+                return
+        # shutdown() ran while the transcript was being created
+        future.set_exception(RuntimeError("Transcription service shut down"))
+
+    def poll(self, client, transcript_id, future):
+        try:
+            response = aai.api.get_transcript(client, transcript_id)
+        except Exception as e:
+            # Could be a network blip; the transcript keeps processing, so
+            # try again on the next round
+            print(f"Error polling transcript {transcript_id}: {e}")
+            return
+        if response.status not in (aai.TranscriptStatus.completed, aai.TranscriptStatus.error):
+            return
+        with self.condition:
+            if self.in_flight.pop(transcript_id, None) is None:
+                return  # Failed by shutdown() meanwhile
+        if response.status == aai.TranscriptStatus.error:
+            future.set_exception(aai.types.TranscriptError(f"Transcript {transcript_id} failed: {response.error}"))
+        else:
+            future.set_result(response)
+
+    def shutdown(self):
+        with self.condition:
+            self.stopped = True
+            waiting = list(self.waiting)
+            self.waiting.clear()
+            in_flight = list(self.in_flight.values())
+            self.in_flight.clear()
+            self.condition.notify_all()
+        for _, _, future in waiting:
+            future.cancel()
+        for future in in_flight:
+            future.set_exception(RuntimeError("Transcription service shut down"))
+
+
+
+def probe_duration(media_file):
+    # Reads the duration from the container, without decoding anything.
+    # Returns seconds, or None if unknown.
+    command = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        media_file
+    ]
+    try:
+        result = subprocess.run(command, check=True, capture_output=True, text=True)
+        return float(result.stdout.strip())
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+
+def scan_audio(media_file, noise="-30dB", min_silence=0.3):
+    # Decodes the audio once to both hash it and run ffmpeg's silencedetect
+    # over it. silencedetect passes the samples through untouched, so the
+    # hash is the one transcriptcache.audio_hash gives. Returns (hash,
+    # duration, silences) with silences as (start, end) seconds; hash is None
+    # if the audio can't be decoded and duration None if unknown.
+    command = [
+        "ffmpeg", "-hide_banner", "-nostats",
+        "-i", media_file,
+        "-map", "0:a:0",
+        "-af", f"silencedetect=noise={noise}:d={min_silence}",
+        "-f", "s16le", "-"
+    ]
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        print(f"Error scanning audio of {media_file}: {e}")
+        return None, None, []
+    # Read the log alongside the audio so neither pipe fills up
+    log = []
+    reader = threading.Thread(target=lambda: log.append(process.stderr.read()), daemon=True)
+    reader.start()
+    digest = hashlib.sha256()
+    with process.stdout:
+        for chunk in iter(lambda: process.stdout.read(1024 * 1024), b""):
+            digest.update(chunk)
+    rc = process.wait()
+    reader.join()
+    stderr = b"".join(log).decode(errors="replace")
+
+    duration = None
+    match = DURATION.search(stderr)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    return digest.hexdigest() if rc == 0 else None, duration, parse_silences(stderr)
+
+
+def parse_silences(log):
+    # (start, end) seconds of every silence silencedetect logged
+    silences = []
+    start = None
+    for line in log.splitlines():
+        match = SILENCE_START.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = SILENCE_END.search(line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    return silences
+
+
+def plan_chunks(duration, silences, chunk_seconds, overlap=2.0):
+    # Splits a recording into chunks of about chunk_seconds, cutting in the
+    # middle of the silence closest to each target within a quarter chunk of
+    # it, or right at the target if there is none. Recordings under one and
+    # a half chunks aren't split.
+    if not duration or duration <= chunk_seconds * 1.5:
+        return [Chunk(0.0, float("inf"), 0.0, None)]
+
+    midpoints = [(start + end) / 2 for start, end in silences]
+    window = chunk_seconds / 4
+    cuts = []
+    position = 0.0
+    while duration - position > chunk_seconds * 1.5:
+        target = position + chunk_seconds
+        candidates = [m for m in midpoints if target - window <= m <= target + window]
+        position = min(candidates, key=lambda m: abs(m - target)) if candidates else target
+        cuts.append(position)
+
+    bounds = [0.0] + cuts + [float("inf")]
+    return [
+        Chunk(start, end, max(0.0, start - overlap), min(duration, end + overlap))
+        for start, end in zip(bounds, bounds[1:])
+    ]
@@ -1,15 +1,332 @@
+import heapq
+import itertools
+import json
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import concurrent.futures
+from collections import namedtuple
 import requests
+from requests.adapters import HTTPAdapter
+from clipcache import get_clip_cache, page_state, FRESH, STALE
+
+GQL_URL = os.getenv("TWITCH_GQL_URL", "https://gql.twitch.tv/gql")
+GQL_HEADERS = {
+    'Client-ID': 'kd1unb4b3q4t58fwlpcbzcbnm76a8fp',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+# Largest page Twitch will return for a single clips query
+MAX_CLIPS_PER_REQUEST = 100
+# Largest number of operations Twitch accepts in one batched GQL request
+MAX_BATCH_SIZE = 35
+
+CLIP_FIELDS = """
+    id
+    slug
+    title
+    createdAt
+    durationSeconds
+    thumbnailURL
+    viewCount
+    game {
+        id
+        displayName
+    }
+"""
+
+
+class TwitchAPIError(Exception):
+    # Raised when a GQL request still fails after all retries, so callers can
+    # tell a failure apart from an empty result
+    pass
+
+
+class TokenBucket:
+    # Allows rate requests per second on average, in bursts of up to capacity.
+    # pause() holds every caller back, e.g. for a server's Retry-After.
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class AdaptiveConcurrencyLimiter:
+    # Caps requests in flight at a limit that grows by about one per round of
+    # successful, fast responses and halves on throttling or server errors
+    # (additive increase, multiplicative decrease). Slow responses shrink it
+    # gently, so concurrency settles where the server stays responsive.
+    def __init__(self, initial=4, minimum=1, maximum=16, latency_target=2.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, ok, latency):
+        with self.condition:
+            self.in_flight -= 1
+            if not ok:
+                self.limit = max(self.minimum, self.limit / 2)
+            elif latency > self.latency_target:
+                self.limit = max(self.minimum, self.limit * 0.9)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+def parse_retry_after(value):
+    # Retry-After is either a number of seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Words in the errors Twitch answers with HTTP 200 when a request was
+# throttled or timed out, rather than wrong; only those are retried
+RETRYABLE_GQL_ERRORS = ("throttl", "rate limit", "too many requests", "timeout", "timed out", "unavailable")
+
+
+def gql_error(item):
+    # The first error message of one GQL response, or None
+    errors = item.get("errors") if isinstance(item, dict) else None
+    if not errors:
+        return None
+    error = errors[0]
+    return error.get("message", str(error)) if isinstance(error, dict) else str(error)
+
+
+def retryable_gql_error(data):
+    # Twitch answers some throttling and timeouts with HTTP 200 and an
+    # "errors" list. Returns the first such error message in a response, or
+    # in any response of a batch, or None. Other errors are the operation's
+    # own and are left to gql_data.
+    for item in data if isinstance(data, list) else [data]:
+        message = gql_error(item)
+        if message is not None and any(word in message.lower() for word in RETRYABLE_GQL_ERRORS):
+            return message
+    return None
+
+
+def gql_data(item):
+    # Returns a response that carries data, even partial data next to
+    # errors; raises TwitchAPIError for one that only carries errors
+    if isinstance(item, dict) and item.get("data") is None:
+        message = gql_error(item)
+        if message is not None:
+            raise TwitchAPIError(f"GQL error: {message}")
+    return item
+
+
+class GQLClient:
+    # Shared transport for all Twitch GQL traffic. Holds one pooled keep-alive
+    # session and can send many operations as a single batched request. Every
+    # request passes a token bucket and an adaptive concurrency limit, and is
+    # retried with jittered exponential backoff on throttling, server errors,
+    # GQL throttling or timeout errors and dropped connections.
+    def __init__(self, url=GQL_URL, headers=GQL_HEADERS, pool_size=10, batch_window=0.02, timeout=30,
+                 rate=10, burst=20, max_retries=5, backoff_base=0.5, backoff_cap=30):
+        self.url = url
+        self.timeout = timeout
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AdaptiveConcurrencyLimiter(maximum=pool_size)
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "server_errors": 0, "gql_errors": 0,
+                      "connection_errors": 0}
+        self.stats_lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(headers)
+
+        # Operations submitted by concurrent callers, waiting to go out together
+        self.pending = []
+        self.pending_lock = threading.Lock()
+        self.flush_timer = None
+
+    def execute(self, query, variables=None):
+        return gql_data(self.execute_batch([{"query": query, "variables": variables or {}}])[0])
+
+    def execute_batch(self, payloads):
+        # Returns one response per payload, in the same order. An operation
+        # that failed on its own comes back with its "errors".
+        results = []
+        for start in range(0, len(payloads), MAX_BATCH_SIZE):
+            chunk = payloads[start:start + MAX_BATCH_SIZE]
+            data = self.post(chunk if len(chunk) > 1 else chunk[0])
+            if isinstance(data, dict):
+                data = [data]
+            if len(data) != len(chunk):
+                raise TwitchAPIError(f"Expected {len(chunk)} GQL responses, got {len(data)}")
+            results.extend(data)
+        return results
+
+    def post(self, body):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            self.limiter.acquire()
+            started = time.monotonic()
+            response, data, reason = None, None, None
+            try:
+                response = self.session.post(self.url, json=body, timeout=self.timeout)
+                if response.status_code == 429 or response.status_code >= 500:
+                    self.count("throttled" if response.status_code == 429 else "server_errors")
+                    reason = f"HTTP {response.status_code}"
+                else:
+                    response.raise_for_status()
+                    data = response.json()
+                    error = retryable_gql_error(data)
+                    if error is not None:
+                        self.count("gql_errors")
+                        reason = f"GQL error: {error}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.count("connection_errors")
+                reason = str(e)
+            except (requests.RequestException, ValueError) as e:
+                raise TwitchAPIError(f"GQL request failed: {e}") from e
+            finally:
+                # Throttling reported as a GQL error backs off like a 429
+                self.limiter.release(reason is None, time.monotonic() - started)
+                self.count("requests")
+
+            if reason is None:
+                return data
+
+            retry_after = None
+            if response is not None:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            if attempt == self.max_retries:
+                raise TwitchAPIError(f"GQL request failed after {attempt + 1} attempts: {reason}")
+
+            delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+            if retry_after is not None:
+                # The server said when to come back; hold all requests until then
+                delay = max(delay, retry_after)
+                self.bucket.pause(delay)
+            self.count("retries")
+            time.sleep(delay)
+
+    def count(self, stat):
+        with self.stats_lock:
+            self.stats[stat] += 1
+
+    def submit(self, query, variables=None):
+        # Queues an operation and returns a Future for its response. Operations
+        # submitted within batch_window of each other share one request.
+        future = concurrent.futures.Future()
+        with self.pending_lock:
+            self.pending.append(({"query": query, "variables": variables or {}}, future))
+            if len(self.pending) >= MAX_BATCH_SIZE:
+                batch = self.take_pending()
+            else:
+                batch = None
+                if self.flush_timer is None:
+                    self.flush_timer = threading.Timer(self.batch_window, self.flush)
+                    self.flush_timer.daemon = True
+                    self.flush_timer.start()
+        if batch:
+            self.send_pending(batch)
+        return future
+
+    def take_pending(self):
+        batch = self.pending
+        self.pending = []
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        return batch
+
+    def flush(self):
+        with self.pending_lock:
+            batch = self.take_pending()
+        if batch:
+            self.send_pending(batch)
+
+    def send_pending(self, batch):
+        try:
+            results = self.execute_batch([payload for payload, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        # One operation's error is only its own caller's
+        for (_, future), result in zip(batch, results):
+            try:
+                future.set_result(gql_data(result))
+            except TwitchAPIError as e:
+                future.set_exception(e)
+
+
+gql_client = GQLClient()
+
+# Compact clip record yielded by iter_clips. cursor is the position right
+# after the clip; pass it back to iter_clips to resume from there.
+ClipRecord = namedtuple("ClipRecord", [
+    "id", "slug", "title", "created_at", "duration", "view_count", "game", "thumbnail_url", "cursor"
+])
+
 
 class ClipFetcher:
-    def __init__(self, username, time_period):
+    def __init__(self, username, time_period, cache=None):
         self.username = username
         self.time_period = self.convert_time_period(time_period)
         self.cursor = ""
-        self.headers = {
-            'Client-ID': 'kd1unb4b3q4t58fwlpcbzcbnm76a8fp',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        self.cursor = ""
+        self.client = gql_client
+        self.cache = cache if cache is not None else get_clip_cache()
+        self.revalidating = set()
+        # Page index: the cursor each known page starts after, and the clips
+        # of every page fetched so far with when they were fetched. A page is
+        # served from the index under the same TTLs as the clip cache, so
+        # revisiting a page costs no requests until it goes stale.
+        self.page_size = None
+        self.page_cursors = {}
+        self.pages = {}
+        self.fetched_at = {}
+        self.last_page = None  # Set once Twitch reports there is no next page
+        self.last_page_fetched_at = None
+        self.lock = threading.Lock()
+        self.reset_index()
 
     def convert_time_period(self, period): 
         period_map = {
@@ -20,31 +337,172 @@ class ClipFetcher:
         }
         return period_map.get(period, "LAST_WEEK")
 
+    def reset_index(self, page_size=None):
+        self.page_size = page_size
+        self.page_cursors = {1: ""}
+        self.pages = {}
+        self.fetched_at = {}
+        self.last_page = None
+        self.last_page_fetched_at = None
+        self.cursor = ""
 
     def fetch_clips(self, limit=30, page=1):
-        if page > 1 and not self.cursor:
-            return []  # No more clips to fetch
+        with self.lock:
+            while True:
+                request = self.next_request(limit, page)
+                if request is None:
+                    return self.pages.get(page, [])
+
+                start_page, cursor, first = request
+                # A TwitchAPIError propagates rather than looking like an empty page
+                data = self.client.execute(self.build_clips_query(cursor, first))
+                if not self.apply_response(start_page, data, limit):
+                    return []
+
+    def plan_request(self, limit, page):
+        # Returns (start_page, cursor, first) for the next request needed to
+        # reach the page, or None if the page is indexed or past the end
+        if limit != self.page_size:
+            self.reset_index(limit)
+        if page in self.pages:
+            state = self.page_state(self.fetched_at[page])
+            if state == STALE:
+                self.revalidate(page, self.page_cursors[page], limit)
+            if state is not None:
+                return None
+            # Too old to show even while refreshing
+            del self.pages[page]
+        if self.last_page is not None and page > self.last_page:
+            if self.page_state(self.last_page_fetched_at) == FRESH:
+                return None
+            # New clips may have pushed the list past its old end
+            self.last_page = None
 
-        url = "https://gql.twitch.tv/gql"
-        query = f"""
+        # Start from the nearest known cursor at or before the page and pull
+        # as many of the missing pages as fit in one request
+        start_page = max(p for p in self.page_cursors if p <= page)
+        pages_wanted = page - start_page + 1
+        first = max(limit, min(limit * pages_wanted, MAX_CLIPS_PER_REQUEST // limit * limit))
+        return start_page, self.page_cursors[start_page], first
+
+    def page_state(self, fetched_at):
+        if self.cache:
+            return self.cache.page_state(self.time_period, fetched_at)
+        return page_state(self.time_period, fetched_at)
+
+    def next_request(self, limit, page):
+        # Like plan_request, but first serves whatever it can from the clip
+        # cache, so only pages missing from it cost a request
+        while True:
+            request = self.plan_request(limit, page)
+            if request is None:
+                return None
+            start_page, cursor, _ = request
+            if not self.load_cached_page(start_page, cursor, limit):
+                return request
+
+    def load_cached_page(self, page_no, cursor, limit):
+        if not self.cache:
+            return False
+        cached = self.cache.get_page(self.username, self.time_period, limit, cursor)
+        if cached is None:
+            return False
+
+        clips, end_cursor, has_next_page, state, fetched_at = cached
+        self.index_page(page_no, clips, end_cursor, has_next_page, fetched_at)
+        if state == STALE:
+            self.revalidate(page_no, cursor, limit)
+        return True
+
+    def revalidate(self, page_no, cursor, limit):
+        key = (page_no, cursor, limit)
+        if key in self.revalidating:
+            return
+        self.revalidating.add(key)
+        threading.Thread(target=self.revalidate_page, args=key, daemon=True).start()
+
+    def revalidate_page(self, page_no, cursor, limit):
+        # Refreshes a stale cached page in the background. The page already
+        # shown stays as is; the fresh copy is used from the next load.
+        try:
+            data = self.client.execute(self.build_clips_query(cursor, limit))
+            clips = data['data']['user']['clips']
+            edges = clips['edges']
+            has_next_page = len(edges) == limit and clips['pageInfo']['hasNextPage']
+            end_cursor = edges[-1]['cursor'] if edges else None
+            if self.cache:
+                self.cache.put_page(self.username, self.time_period, limit, cursor,
+                                    [edge['node'] for edge in edges], end_cursor, has_next_page)
+            with self.lock:
+                if edges and self.page_size == limit and self.page_cursors.get(page_no) == cursor:
+                    self.pages[page_no] = [edge['node'] for edge in edges]
+                    self.fetched_at[page_no] = time.time()
+        except TwitchAPIError as e:
+            print(f"Error refreshing cached clips: {e}")
+        except (KeyError, IndexError, TypeError) as e:
+            print(f"Error parsing clip data: {e}")
+        finally:
+            with self.lock:
+                self.revalidating.discard((page_no, cursor, limit))
+
+    def apply_response(self, start_page, data, limit):
+        try:
+            clips = data['data']['user']['clips']
+            edges, has_next_page = clips['edges'], clips['pageInfo']['hasNextPage']
+        except (KeyError, IndexError, TypeError) as e:
+            print(f"Error parsing clip data: {e}")
+            return False
+        self.index_pages(start_page, edges, has_next_page, limit)
+        return True
+
+    def index_pages(self, start_page, edges, has_next_page, limit):
+        fetched_at = time.time()
+        if not edges:
+            self.index_page(start_page, [], None, False, fetched_at)
+            self.store_page(start_page, limit)
+            return
+
+        for offset in range(0, len(edges), limit):
+            page_edges = edges[offset:offset + limit]
+            page_no = start_page + offset // limit
+            more = len(page_edges) == limit and (offset + limit < len(edges) or has_next_page)
+            self.index_page(page_no, [edge['node'] for edge in page_edges], page_edges[-1]['cursor'], more, fetched_at)
+            self.store_page(page_no, limit)
+
+    def index_page(self, page_no, clips, end_cursor, has_next_page, fetched_at):
+        if not clips:
+            self.last_page = page_no - 1
+            self.last_page_fetched_at = fetched_at
+            return
+        self.pages[page_no] = clips
+        self.fetched_at[page_no] = fetched_at
+        self.cursor = end_cursor
+        if has_next_page:
+            self.page_cursors[page_no + 1] = end_cursor
+        else:
+            self.last_page = page_no
+            self.last_page_fetched_at = fetched_at
+
+    def store_page(self, page_no, limit):
+        if not self.cache:
+            return
+        try:
+            self.cache.put_page(
+                self.username, self.time_period, limit, self.page_cursors[page_no],
+                self.pages.get(page_no, []), self.page_cursors.get(page_no + 1, self.cursor),
+                self.last_page is None or page_no < self.last_page
+            )
+        except sqlite3.Error as e:
+            print(f"Error caching clips: {e}")
+
+    def build_clips_query(self, cursor, first):
+        return f"""
         query {{
-            user(login: "{self.username}") {{
-                clips(first: {limit}, after: "{self.cursor}", criteria: {{ period: {self.time_period} }}) {{
+            user(login: {json.dumps(self.username)}) {{
+                clips(first: {first}, after: {json.dumps(cursor)}, criteria: {{ period: {self.time_period} }}) {{
                     edges {{
                         cursor
-                        node {{
-                            id
-                            slug
-                            title
-                            createdAt
-                            durationSeconds
-                            thumbnailURL
-                            viewCount
-                            game {{
-                                id
-                                displayName
-                            }}
-                        }}
+                        node {{{CLIP_FIELDS}}}
                     }}
                     pageInfo {{
                         hasNextPage
@@ -54,43 +512,196 @@ class ClipFetcher:
             }}
         }}
         """
-        payload = {
-            "query": query,
-            "variables": {}
-        }
-        try:
-            response = requests.post(url, json=payload, headers=self.headers)
-            response.raise_for_status()
-            data = response.json()
-            
-            clips = data['data']['user']['clips']['edges']
-            if clips:
-                self.cursor = clips[-1]['cursor']
-            
-            return [clip['node'] for clip in clips]
-        except requests.RequestException as e:
-            print(f"Error fetching clips: {e}")
-            return []
-        except (KeyError, IndexError) as e:
-            print(f"Error parsing clip data: {e}")
-            return []
-        
-        clips = data['data']['user']['clips']['edges']
-        if clips:
-            self.cursor = clips[-1]['cursor']
-        
-        return [clip['node'] for clip in clips]
+
+
+# Fetchers are kept per (username, period) so their page index survives
+# between "Fetch Clips" clicks and page changes
+clip_fetchers = {}
+clip_fetchers_lock = threading.Lock()
+
 
 def get_clip_fetcher(username, time_period):
-    return ClipFetcher(username, time_period)
+    key = (username.strip().lower(), time_period)
+    with clip_fetchers_lock:
+        if key not in clip_fetchers:
+            clip_fetchers[key] = ClipFetcher(username.strip(), time_period)
+        return clip_fetchers[key]
 
 
 def fetch_clips(clip_fetcher, limit=30, page=1):
-    clips = []
-    for _ in range(page):
-        new_clips = clip_fetcher.fetch_clips(limit)
-        if _ == page - 1:
-            clips = new_clips
-        if not new_clips:
+    return clip_fetcher.fetch_clips(limit, page)
+
+
+def fetch_pages(fetcher_pages, limit=30):
+    # Fetches many (fetcher, page) pairs, e.g. page 1 for hundreds of
+    # streamers, sending one batched request per round instead of one request
+    # per page. Returns the clips for each pair, in order.
+    remaining = list(dict.fromkeys(fetcher_pages))
+    while remaining:
+        planned = []
+        for fetcher, page in remaining:
+            with fetcher.lock:
+                request = fetcher.next_request(limit, page)
+            if request is not None:
+                planned.append((fetcher, page, request))
+
+        # Pages of the same fetcher often share a start cursor; send one
+        # request per cursor, large enough for the furthest page wanted
+        requests_by_key = {}
+        for fetcher, _, (start_page, cursor, first) in planned:
+            key = (id(fetcher), start_page)
+            if key not in requests_by_key or requests_by_key[key][3] < first:
+                requests_by_key[key] = (fetcher, start_page, cursor, first)
+        if not requests_by_key:
             break
-    return clips
\ No newline at end of file
+
+        operations = list(requests_by_key.values())
+        results = gql_client.execute_batch([
+            {"query": fetcher.build_clips_query(cursor, first), "variables": {}}
+            for fetcher, _, cursor, first in operations
+        ])
+
+        failed = set()
+        for (fetcher, start_page, _, _), data in zip(operations, results):
+            with fetcher.lock:
+                if not fetcher.apply_response(start_page, data, limit):
+                    failed.add(id(fetcher))
+        remaining = [(fetcher, page) for fetcher, page, _ in planned if id(fetcher) not in failed]
+
+    return [fetcher.pages.get(page, []) for fetcher, page in fetcher_pages]
+
+
+def fetch_clips_by_slugs(slugs):
+    # Looks up clip metadata for many slugs in batched requests. Returns one
+    # clip dict per slug, or None where the slug is unknown.
+    results = gql_client.execute_batch([
+        {"query": f"query {{ clip(slug: {json.dumps(slug)}) {{{CLIP_FIELDS}}} }}", "variables": {}}
+        for slug in slugs
+    ])
+    clips = []
+    for data in results:
+        clips.append((data.get('data') or {}).get('clip'))
+    return clips
+
+
+def iter_clips(login, period, cursor="", page_size=MAX_CLIPS_PER_REQUEST, read_ahead=2):
+    # Yields a ClipRecord for every clip of the streamer in the period,
+    # following cursors until Twitch reports no next page. Pages are fetched
+    # on a background thread at most read_ahead pages ahead of the consumer,
+    # and nothing is kept once yielded, so memory stays flat however many
+    # clips there are. To resume an interrupted crawl, pass the cursor of the
+    # last record processed.
+    fetcher = ClipFetcher(login, period, cache=False)
+    pages = queue.Queue(maxsize=read_ahead)
+    stop = threading.Event()
+
+    def produce():
+        next_cursor = cursor
+        try:
+            while not stop.is_set():
+                data = fetcher.client.execute(fetcher.build_clips_query(next_cursor, page_size))
+                user = data['data']['user']
+                if user is None:
+                    raise ValueError(f"Unknown streamer: {login}")
+                clips = user['clips']
+                edges = clips['edges']
+                has_next_page = bool(edges) and clips['pageInfo']['hasNextPage']
+                put(edges)
+                if not has_next_page:
+                    break
+                next_cursor = edges[-1]['cursor']
+        except Exception as e:
+            put(e)
+        put(None)
+
+    def put(item):
+        # Blocks while the consumer is read_ahead pages behind, but gives up
+        # once the consumer has gone away
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                pass
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            edges = pages.get()
+            if edges is None:
+                return
+            if isinstance(edges, Exception):
+                raise edges
+            for edge in edges:
+                node = edge['node']
+                game = node.get('game')
+                yield ClipRecord(
+                    node['id'], node['slug'], node['title'], node['createdAt'], node['durationSeconds'],
+                    node['viewCount'], game['displayName'] if game else None, node['thumbnailURL'], edge['cursor']
+                )
+    finally:
+        stop.set()
+
+
+def top_clips(logins, period, k=50, key="viewCount", max_workers=8, page_size=None):
+    # Returns the k best clips across all the streamers in the period, best
+    # first, each tagged with its streamer's login under 'broadcasterLogin'.
+    # Streamers are fetched concurrently, their requests sharing batched GQL
+    # calls. Twitch returns clips by descending view count, so when ranking
+    # by viewCount a streamer stops being paged as soon as the last clip of
+    # its page can no longer enter the top k.
+    page_size = page_size or min(max(k, 10), MAX_CLIPS_PER_REQUEST)
+    can_prune = key == "viewCount"
+    heap = []  # Min-heap of (key value, clip id, tie-break, clip); the root is the current k-th best
+    heap_lock = threading.Lock()
+    counter = itertools.count()
+
+    def offer(clip):
+        entry = (clip[key], clip['id'], next(counter), clip)
+        with heap_lock:
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+
+    def crawl(login):
+        fetcher = ClipFetcher(login, period, cache=False)
+        cursor = ""
+        while True:
+            data = gql_client.submit(fetcher.build_clips_query(cursor, page_size)).result()
+            user = data['data']['user']
+            if user is None:
+                print(f"Unknown streamer: {login}")
+                return
+            clips = user['clips']
+            edges = clips['edges']
+            for edge in edges:
+                offer(dict(edge['node'], broadcasterLogin=login))
+            if not edges or not clips['pageInfo']['hasNextPage']:
+                return
+
+            if can_prune:
+                with heap_lock:
+                    if len(heap) >= k and edges[-1]['node'][key] <= heap[0][0]:
+                        return
+            cursor = edges[-1]['cursor']
+
+    # A streamer that could not be fetched would silently drop its clips from
+    # the ranking, so the first such failure is raised once all are done
+    failure = None
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(crawl, login): login for login in dict.fromkeys(logins)}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            except TwitchAPIError as e:
+                print(f"Error fetching clips for {futures[future]}: {e}")
+                failure = failure or e
+            except (KeyError, TypeError) as e:
+                print(f"Error parsing clips for {futures[future]}: {e}")
+                failure = failure or TwitchAPIError(f"Unexpected clip data for {futures[future]}: {e}")
+    if failure is not None:
+        raise failure
+
+    return [clip for _, _, _, clip in sorted(heap, key=lambda entry: entry[:3], reverse=True)]
@@ -3,3 +3,14 @@ def is_valid_time(time_str):
 
 def format_time(time_str):
     return f"{time_str[:2]}:{time_str[2:4]}:{time_str[4:6]}"
+
+def merge_intervals(intervals, padding=0):
+    # Widens each (start, end) interval by padding on both sides, sorts them
+    # and merges the ones that overlap or touch
+    merged = []
+    for start, end in sorted((max(0, start - padding), end + padding) for start, end in intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]